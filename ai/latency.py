@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyTracker:
+    """Rolling per-model latency and outcome window shared by all call sites."""
+
+    def __init__(self, window=200, min_samples=10):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def record(self, model: str, latency: float, ok: bool = True):
+        with self._lock:
+            self._samples[model].append((latency, ok))
+
+    def percentile(self, model: str, q: float) -> Optional[float]:
+        """Latency percentile (0-100) over successful calls, None until warmed up."""
+        with self._lock:
+            latencies = sorted(lat for lat, ok in self._samples[model] if ok)
+        if len(latencies) < self.min_samples:
+            return None
+        index = min(len(latencies) - 1, int(round(q / 100 * (len(latencies) - 1))))
+        return latencies[index]
+
+    def error_rate(self, model: str) -> float:
+        with self._lock:
+            samples = list(self._samples[model])
+        if not samples:
+            return 0.0
+        return sum(1 for _, ok in samples if not ok) / len(samples)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            models = list(self._samples)
+        return {
+            model: {
+                "p50": self.percentile(model, 50),
+                "p90": self.percentile(model, 90),
+                "error_rate": self.error_rate(model),
+                "samples": len(self._samples[model]),
+            }
+            for model in models
+        }
+
+
+class Hedger:
+    """
+    Runs a primary call and, if it hasn't answered within `delay` seconds,
+    fires an equivalent fallback call. Whichever finishes first wins.
+
+    The provider SDKs are blocking, so the losing call cannot be interrupted
+    mid-request; its future is cancelled if it hasn't started yet and its
+    result is discarded otherwise. Losers keep their thread until the
+    provider's own timeout, so calls still running are counted and hedging
+    is skipped while the pool has no free thread for both calls: during a
+    provider outage new calls run unhedged on the caller's thread instead of
+    queueing behind stuck ones.
+    """
+
+    def __init__(self, max_workers=16):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge")
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self.hedged = 0
+        self.skipped = 0
+
+    def _reserve(self, calls: int) -> bool:
+        with self._lock:
+            if self._in_flight + calls > self.max_workers:
+                self.skipped += 1
+                return False
+            self._in_flight += calls
+            return True
+
+    def _release(self, *_):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _submit(self, fn: Callable[[], str]):
+        future = self._executor.submit(fn)
+        future.add_done_callback(self._release)
+        return future
+
+    def call(self, primary: Callable[[], str], fallback: Callable[[], str], delay: float) -> str:
+        # a thread for the primary and one for a possible hedge, or no hedging at all
+        if not self._reserve(2):
+            logger.warning("Hedging pool saturated, calling the primary model unhedged")
+            return primary()
+        primary_future = self._submit(primary)
+        done, _ = wait([primary_future], timeout=delay)
+        if done and primary_future.exception() is None:
+            self._release()
+            return primary_future.result()
+
+        logger.info(f"Primary model slower than {delay:.2f}s or failed, hedging with fallback")
+        self.hedged += 1
+        fallback_future = self._submit(fallback)
+        pending = {primary_future, fallback_future}
+        last_error = None
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                last_error = future.exception()
+
+        raise last_error
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = self._in_flight
+        return {"in_flight": in_flight, "max_workers": self.max_workers, "hedged": self.hedged, "skipped": self.skipped}
+
+
+def timed(tracker, model: str, fn: Callable[[], str]) -> Callable[[], str]:
+    """Wrap `fn` so its latency and outcome are recorded under `model` on a ModelRouter."""
+    def run():
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            tracker.record(model, time.perf_counter() - start, ok=False, error=e)
+            raise
+        tracker.record(model, time.perf_counter() - start, ok=True)
+        return result
+    return run
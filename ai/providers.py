@@ -0,0 +1,52 @@
+import importlib
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderRegistry:
+    """
+    Named provider clients that are imported and constructed on first use.
+
+    Provider SDKs are slow to import and some (fastembed) load a model when
+    constructed, so nothing is built until a request actually needs it or
+    `warm_up` is called once the server is listening.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        self._factories[name] = factory
+
+    def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            if name not in self._instances:
+                start = time.perf_counter()
+                self._instances[name] = self._factories[name]()
+                logger.info(f"Initialized provider {name} in {time.perf_counter() - start:.2f}s")
+            return self._instances[name]
+
+    def loaded(self) -> list:
+        return list(self._instances)
+
+    def warm_up(self, names: Optional[Iterable[str]] = None, modules: Iterable[str] = ()):
+        """Construct providers and import modules ahead of the first request that needs them."""
+        for module in modules:
+            try:
+                importlib.import_module(module)
+            except Exception as e:
+                logger.warning(f"Warm-up import of {module} failed: {str(e)}")
+        for name in names if names is not None else self._factories:
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.warning(f"Warm-up of provider {name} failed: {str(e)}")
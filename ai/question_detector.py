@@ -0,0 +1,149 @@
+import json
+import logging
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INTERROGATIVES = frozenset((
+    "what", "who", "whom", "whose", "when", "where", "why", "how", "which",
+))
+AUXILIARIES = frozenset((
+    "do", "does", "did", "can", "could", "would", "should", "will", "shall",
+    "is", "are", "was", "were", "have", "has", "had", "may", "might", "am",
+))
+RECALL_PHRASES = (
+    "remind me", "do you remember", "do you recall", "tell us about", "tell me about",
+    "what was", "what were", "what is the", "can you share", "walk us through",
+)
+
+SENTENCE_RE = re.compile(r'[^.!?]+[.!?]*')
+WORD_RE = re.compile(r"[a-z']+")
+
+# logistic weights over the features below, hand-set so that a trailing
+# question mark or an opening interrogative alone is enough to call the LLM
+DEFAULT_WEIGHTS = {
+    "bias": -3.0,
+    "ends_with_question_mark": 4.5,
+    "starts_interrogative": 2.5,
+    "starts_auxiliary": 1.5,
+    "recall_phrase": 2.0,
+    "question_mark_in_tail": 1.5,
+    "interrogative_in_tail": 1.0,
+}
+
+
+@dataclass
+class Detection:
+    probability: float
+    question: Optional[str]
+
+
+class QuestionDetector:
+    """
+    Cheap local check of whether the tail of a transcript holds a question,
+    run before the needs_help LLM call.
+
+    Features are question-mark and interrogative-word heuristics scored by a
+    tiny logistic model. The default weights are hand-set; a JSON file of
+    weights fitted offline on logged LLM verdicts can replace them. A
+    detection is confident when its probability is within `1 - threshold` of
+    0 or 1, only those may skip the LLM.
+
+    In "shadow" mode the LLM always runs and the detector's verdicts are
+    compared against it; in "on" mode confident detections skip the LLM.
+    """
+
+    def __init__(self, mode: str = "off", threshold: float = 0.9, weights: Optional[Dict[str, float]] = None):
+        self.mode = mode
+        self.threshold = threshold
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.calls = 0
+        self.confident = 0
+        self.skipped = 0
+        self.compared = 0
+        self.agreed = 0
+        self.confident_compared = 0
+        self.confident_agreed = 0
+
+    @classmethod
+    def from_config(cls, mode: str, threshold: float, weights_path: Optional[str] = None) -> "QuestionDetector":
+        weights = None
+        if weights_path:
+            try:
+                with open(weights_path) as f:
+                    weights = json.load(f)
+            except Exception as e:
+                logger.error(f"Failed to load question detector weights from {weights_path}: {str(e)}")
+        return cls(mode=mode, threshold=threshold, weights=weights)
+
+    @staticmethod
+    def features(transcript: str) -> Dict[str, float]:
+        tail = transcript[-400:]
+        sentences = [sentence.strip() for sentence in SENTENCE_RE.findall(tail) if sentence.strip()]
+        last = sentences[-1] if sentences else ""
+        words = WORD_RE.findall(last.lower())
+        first_word = words[0] if words else ""
+        tail_words = set(WORD_RE.findall(tail.lower()))
+        lowered = last.lower()
+        return {
+            "ends_with_question_mark": float(last.endswith("?")),
+            "starts_interrogative": float(first_word in INTERROGATIVES),
+            "starts_auxiliary": float(first_word in AUXILIARIES),
+            "recall_phrase": float(any(phrase in lowered for phrase in RECALL_PHRASES)),
+            "question_mark_in_tail": float("?" in tail),
+            "interrogative_in_tail": float(bool(tail_words & INTERROGATIVES)),
+        }
+
+    def detect(self, transcript: str) -> Detection:
+        self.calls += 1
+        features = self.features(transcript)
+        score = self.weights["bias"] + sum(self.weights.get(name, 0.0) * value for name, value in features.items())
+        probability = 1 / (1 + math.exp(-score))
+        return Detection(probability=probability, question=self._last_question(transcript))
+
+    def is_confident(self, detection: Detection) -> bool:
+        return detection.probability >= self.threshold or detection.probability <= 1 - self.threshold
+
+    def should_skip(self, detection: Detection) -> bool:
+        """Whether the LLM call can be skipped for this detection."""
+        if not self.is_confident(detection):
+            return False
+        self.confident += 1
+        # a confident question is only used as-is when there is a sentence to quote
+        if detection.probability >= self.threshold and not detection.question:
+            return False
+        if self.mode != "on":
+            return False
+        self.skipped += 1
+        return True
+
+    def record_llm(self, detection: Detection, needs_help: bool):
+        """Compare a detection against the LLM's verdict for the same transcript."""
+        agreed = (detection.probability >= 0.5) == bool(needs_help)
+        self.compared += 1
+        self.agreed += agreed
+        if self.is_confident(detection):
+            self.confident_compared += 1
+            self.confident_agreed += agreed
+
+    @staticmethod
+    def _last_question(transcript: str) -> Optional[str]:
+        sentences: List[str] = [sentence.strip() for sentence in SENTENCE_RE.findall(transcript[-400:])]
+        for sentence in reversed(sentences):
+            if sentence.endswith("?"):
+                return sentence
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "calls": self.calls,
+            "confident_rate": self.confident / self.calls if self.calls else 0.0,
+            "skip_rate": self.skipped / self.calls if self.calls else 0.0,
+            "agreement": self.agreed / self.compared if self.compared else None,
+            "confident_agreement": self.confident_agreed / self.confident_compared if self.confident_compared else None,
+            "compared": self.compared,
+        }
@@ -0,0 +1,261 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from ai.latency import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+# context window per logical model name, in tokens
+MODEL_CONTEXT_LIMITS = {
+    "gpt-4o": 128_000,
+    "gpt-4o-mini": 128_000,
+    "llama-3.1-8b": 128_000,
+    "llama-3.3": 128_000,
+    "llama-3.2": 8_192,
+    "llama3.2": 128_000,
+    "gemini-1.5-flash": 1_000_000,
+    "gemini-1.5-pro": 2_000_000,
+    "gemini-2.0-flash": 1_000_000,
+}
+
+# tokens kept free for the model's answer when checking context requirements
+OUTPUT_TOKEN_RESERVE = 4_096
+
+
+# exception class names, across the provider SDKs and requests, of failures on
+# the provider's side rather than of a request it rejected
+PROVIDER_FAILURE_NAMES = {
+    "APITimeoutError", "APIConnectionError", "InternalServerError",
+    "ServerError", "ServiceUnavailable", "DeadlineExceeded",
+    "Timeout", "ReadTimeout", "ConnectTimeout", "ConnectionError",
+}
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """Whether `error` is a timeout, a connection error or a 5xx, as opposed to a rejected input."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ in PROVIDER_FAILURE_NAMES for cls in type(error).__mro__):
+        return True
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None) or getattr(error, "code", None)
+    return isinstance(status, int) and status >= 500
+
+
+def estimate_tokens(messages) -> int:
+    # ~4 characters per token is close enough for picking a context window
+    return sum(len(message["content"]) for message in messages) // 4
+
+
+class CircuitBreaker:
+    """
+    Closed until `failure_threshold` consecutive failures, then open for
+    `reset_timeout` seconds. After that a single trial call is let through
+    (half-open); its outcome closes or re-opens the breaker.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def is_available(self) -> bool:
+        """Like `allow` but without claiming the half-open trial slot."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at >= self.reset_timeout
+            return not self._trial_in_flight
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """End a half-open trial without a verdict, so the next call can probe again."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit opened after {self.failures} consecutive failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+@dataclass
+class ModelTier:
+    name: str
+    # models able to serve the tier, in order of preference
+    models: List[str]
+    # largest input, in tokens, the tier is picked for; None means unbounded
+    max_tokens: Optional[int] = None
+
+
+@dataclass
+class TaskRoute:
+    # tiers from smallest/fastest to largest; inputs go to the first tier that
+    # fits them and escalate to the following tiers on failure
+    tiers: List[ModelTier]
+    # whether a second candidate may be hedged against the first
+    hedge: bool = True
+
+    @classmethod
+    def single(cls, models: List[str], hedge: bool = True) -> "TaskRoute":
+        return cls([ModelTier("default", models)], hedge)
+
+    @classmethod
+    def from_config(cls, config) -> "TaskRoute":
+        """
+        Accepts a plain model list, a list of {"name", "models", "max_tokens"}
+        tiers, or {"hedge": false, "tiers": [...]} with either of those as tiers.
+        """
+        hedge = True
+        if isinstance(config, dict):
+            hedge = config.get("hedge", True)
+            config = config["tiers"]
+        if all(isinstance(item, str) for item in config):
+            return cls.single(config, hedge)
+        return cls([ModelTier(tier["name"], tier["models"], tier.get("max_tokens")) for tier in config], hedge)
+
+    def select_tier(self, input_tokens: int) -> int:
+        for index, tier in enumerate(self.tiers):
+            if tier.max_tokens is None or input_tokens <= tier.max_tokens:
+                return index
+        return len(self.tiers) - 1
+
+    @property
+    def candidates(self) -> List[str]:
+        models = []
+        for tier in self.tiers:
+            models += [model for model in tier.models if model not in models]
+        return models
+
+
+DEFAULT_ROUTES = {
+    # the structured notes/action items schema is only wired up for Gemini
+    "summarize": TaskRoute([
+        ModelTier("small", ["gemini-2.0-flash", "gemini-1.5-flash"], max_tokens=16_000),
+        ModelTier("large", ["gemini-1.5-pro", "gemini-2.0-flash"]),
+    ]),
+    "title": TaskRoute([
+        ModelTier("small", ["gpt-4o-mini", "llama-3.1-8b"], max_tokens=8_000),
+        ModelTier("large", ["gpt-4o", "llama-3.3"]),
+    ]),
+    # yes/no classification doesn't need a frontier model
+    "needs_help": TaskRoute([
+        ModelTier("small", ["gpt-4o-mini", "llama-3.1-8b"], max_tokens=8_000),
+        ModelTier("large", ["gpt-4o", "llama-3.3"]),
+    ]),
+    "suggest": TaskRoute.single(["gpt-4o", "llama-3.3"]),
+    "action_items": TaskRoute.single(["llama-3.3", "gpt-4o"]),
+    "notes": TaskRoute.single(["llama-3.3", "gpt-4o"]),
+}
+
+
+@dataclass
+class ModelRouter:
+    """
+    Picks the fastest healthy model for a logical task. Latency and errors are
+    tracked per model; a circuit breaker per model takes failing providers out
+    of rotation so callers don't wait on timeouts during an outage.
+    """
+
+    routes: Dict[str, TaskRoute] = field(default_factory=lambda: dict(DEFAULT_ROUTES))
+    latency: LatencyTracker = field(default_factory=LatencyTracker)
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+    breakers: Dict[str, CircuitBreaker] = field(default_factory=dict)
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        if model not in self.breakers:
+            self.breakers[model] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return self.breakers[model]
+
+    def record(self, model: str, latency: float, ok: bool = True, error: Optional[BaseException] = None):
+        self.latency.record(model, latency, ok)
+        if ok:
+            self.breaker(model).record_success()
+        elif error is not None and not is_provider_failure(error):
+            # a rejected input says nothing about the provider's health either way
+            self.breaker(model).release_trial()
+        else:
+            self.breaker(model).record_failure()
+
+    def route(self, task: str, input_tokens: int = 0) -> List[str]:
+        """
+        Candidates for `task`, starting at the smallest tier that fits
+        `input_tokens` and escalating through the larger tiers. Within a tier,
+        healthy models are ordered by expected latency; models without enough
+        latency samples keep their configured order behind the measured ones,
+        so fallbacks are only explored on failover or hedging. If every breaker
+        is open the fitting models are returned rather than failing fast.
+        """
+        route = self.routes[task]
+        required = input_tokens + OUTPUT_TOKEN_RESERVE
+        start = route.select_tier(input_tokens)
+
+        def fits(model):
+            return MODEL_CONTEXT_LIMITS.get(model, 0) >= required
+
+        def speed(model):
+            # expected time to a successful answer, so flaky models rank lower
+            p50 = self.latency.percentile(model, 50)
+            if p50 is None:
+                return float("inf")
+            return p50 / max(1.0 - self.latency.error_rate(model), 0.05)
+
+        ordered, fitting = [], []
+        for tier in route.tiers[start:]:
+            fitting += [model for model in tier.models if fits(model) and model not in fitting]
+            healthy = [
+                model for model in tier.models
+                if fits(model) and model not in ordered and self.breaker(model).is_available()
+            ]
+            ordered += sorted(healthy, key=speed)
+
+        if not ordered:
+            logger.warning(f"No healthy model for task {task}, trying them anyway")
+            return fitting or route.candidates
+
+        logger.info(
+            f"Routing task {task} ({input_tokens} tokens) to tier "
+            f"{route.tiers[start].name}: {ordered}"
+        )
+        return ordered
+
+    def snapshot(self) -> dict:
+        stats = self.latency.snapshot()
+        for model, breaker in self.breakers.items():
+            stats.setdefault(model, {})["circuit"] = breaker.state
+        return stats
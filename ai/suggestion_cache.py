@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+import numpy as np
+
+
+class SemanticSuggestionCache:
+    """
+    Per-meeting cache of generated suggestions keyed by question embedding.
+
+    A question whose embedding is within `threshold` cosine similarity of a
+    cached one gets the cached suggestion, so rephrasing the same question
+    during a call doesn't generate it again. Entries expire after `ttl`
+    seconds, each meeting keeps at most `max_entries` and at most
+    `max_meetings` meetings are kept, least recently used first out.
+
+    Embeddings of the exact same question text are cached too, which saves
+    the embedding call when a question is repeated word for word.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.92,
+        ttl: float = 900,
+        max_entries: int = 64,
+        max_meetings: int = 1000,
+        max_embeddings: int = 10000,
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_meetings = max_meetings
+        self.max_embeddings = max_embeddings
+        self._meetings = OrderedDict()
+        self._embeddings = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.embedding_hits = 0
+        self.embedding_misses = 0
+
+    def embed(self, text: str, embed_fn: Callable[[str], list]) -> list:
+        """Embedding of `text`, computed with `embed_fn` unless the same text was embedded before."""
+        key = " ".join(text.lower().split())
+        with self._lock:
+            embedding = self._embeddings.get(key)
+            if embedding is not None:
+                self._embeddings.move_to_end(key)
+                self.embedding_hits += 1
+                return embedding
+        embedding = embed_fn(text)
+        with self._lock:
+            self.embedding_misses += 1
+            self._embeddings[key] = embedding
+            while len(self._embeddings) > self.max_embeddings:
+                self._embeddings.popitem(last=False)
+        return embedding
+
+    def lookup(self, meeting_key: Hashable, embedding) -> Optional[str]:
+        """Cached suggestion for the closest question above the threshold, if any."""
+        query = _unit(embedding)
+        now = time.monotonic()
+        with self._lock:
+            entries = self._meetings.get(meeting_key)
+            if entries:
+                entries[:] = [entry for entry in entries if entry[0] > now]
+            if not entries:
+                self.misses += 1
+                return None
+            self._meetings.move_to_end(meeting_key)
+            similarities = np.stack([entry[1] for entry in entries]) @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entries[best][2]
+
+    def store(self, meeting_key: Hashable, embedding, suggestion: str):
+        with self._lock:
+            entries = self._meetings.setdefault(meeting_key, [])
+            entries.append((time.monotonic() + self.ttl, _unit(embedding), suggestion))
+            del entries[:-self.max_entries]
+            self._meetings.move_to_end(meeting_key)
+            while len(self._meetings) > self.max_meetings:
+                self._meetings.popitem(last=False)
+
+    def invalidate(self, meeting_key: Hashable):
+        with self._lock:
+            self._meetings.pop(meeting_key, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        embeddings = self.embedding_hits + self.embedding_misses
+        return {
+            "meetings": len(self._meetings),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "lookups": lookups,
+            "embedding_hit_rate": self.embedding_hits / embeddings if embeddings else 0.0,
+        }
+
+
+def _unit(embedding) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
@@ -0,0 +1,74 @@
+"""
+Measures how long a worker takes to import index.py.
+
+    python benchmarks/import_time.py [--runs 5] [--top 15]
+
+Each run imports index in a fresh interpreter with `-X importtime` and reports
+the wall time and the slowest modules by cumulative import time. Dummy
+Supabase credentials are filled in when none are set, since creating the
+clients doesn't touch the network.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DUMMY_ENV = {
+    "SUPABASE_URL": "http://localhost:54321",
+    "SUPABASE_SERVICE_ROLE_KEY": "header.payload.signature",
+    "CLIENT_MODE": "ONLINE",
+}
+
+
+def run_once(env, workdir):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import index"],
+        cwd=workdir,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr[-2000:])
+        sys.exit(result.returncode)
+    return wall, parse_importtime(result.stderr)
+
+
+def parse_importtime(stderr):
+    """{module: cumulative microseconds} from `-X importtime` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time:  self_us | cumulative_us | <indent>module"
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative_us)
+    return modules
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    env = {**DUMMY_ENV, **os.environ, "PYTHONPATH": REPO_DIR}
+    walls = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(args.runs):
+            wall, modules = run_once(env, workdir)
+            walls.append(wall)
+
+    print(f"wall time over {args.runs} runs: median {statistics.median(walls):.3f}s, min {min(walls):.3f}s")
+    print(f"index cumulative import: {modules.get('index', 0) / 1e6:.3f}s (last run)")
+    print(f"\n{'cumulative':>12}  module")
+    top_level = {name: us for name, us in modules.items() if "." not in name and name != "index"}
+    for name, us in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{us / 1e6:>11.3f}s  {name}")
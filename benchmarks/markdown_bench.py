@@ -0,0 +1,62 @@
+"""
+Checks markdown_to_html against the golden corpus and times it on growing
+notes documents.
+
+    python benchmarks/markdown_bench.py [--check-only]
+
+Every `markdown_corpus/<name>.md` must render exactly to `<name>.html`. The
+timings should grow linearly with the document size.
+"""
+import argparse
+import glob
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.markdown import markdown_to_html  # noqa: E402
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "markdown_corpus")
+
+
+def check_corpus() -> bool:
+    ok = True
+    for source_path in sorted(glob.glob(os.path.join(CORPUS_DIR, "*.md"))):
+        with open(source_path) as f:
+            source = f.read()
+        with open(source_path[:-3] + ".html") as f:
+            expected = f.read()
+        if markdown_to_html(source) != expected:
+            print(f"MISMATCH {os.path.basename(source_path)}")
+            ok = False
+    return ok
+
+
+def bench():
+    documents = []
+    for source_path in sorted(glob.glob(os.path.join(CORPUS_DIR, "*.md"))):
+        if "unclosed" in source_path:
+            continue
+        with open(source_path) as f:
+            documents.append(f.read())
+    unit = "\n\n".join(documents)
+
+    print(f"{'copies':>8} {'chars':>10} {'ms/render':>10} {'us/kchar':>9}")
+    for copies in (1, 10, 100, 1000):
+        document = "\n\n".join([unit] * copies)
+        runs = max(1, 200 // copies)
+        seconds = min(timeit.repeat(lambda: markdown_to_html(document), number=runs, repeat=3)) / runs
+        print(f"{copies:>8} {len(document):>10} {seconds * 1000:>10.3f} {seconds * 1e6 / (len(document) / 1000):>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--check-only", action="store_true")
+    args = parser.parse_args()
+
+    if not check_corpus():
+        sys.exit(1)
+    print("golden corpus ok")
+    if not args.check_only:
+        bench()
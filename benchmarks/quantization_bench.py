@@ -0,0 +1,63 @@
+"""
+Recall and speed of quantized first-pass search with exact rescoring, on a
+synthetic clustered corpus shaped like chunk embeddings.
+
+    python benchmarks/quantization_bench.py [--dim 1024] [--sizes 1000 10000 50000]
+
+Recall@k is measured against exact float32 search for the same queries.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from retrieval.quantization import QuantizedIndex, normalize  # noqa: E402
+
+
+def synthetic_corpus(size, dim, clusters, rng):
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(clusters, size=size)
+    return normalize(centers[labels] + 0.6 * rng.normal(size=(size, dim))).astype(np.float32)
+
+
+def queries_near(corpus, count, rng):
+    picks = corpus[rng.integers(len(corpus), size=count)]
+    return normalize(picks + 0.3 * rng.normal(size=picks.shape) / np.sqrt(corpus.shape[1]) * 10)
+
+
+def bench(corpus, queries, mode, oversampling, top_k):
+    exact = QuantizedIndex(corpus, mode="float32")
+    index = QuantizedIndex(corpus, mode=mode, oversampling=oversampling)
+    truth = [set(exact.search(query, top_k)) for query in queries]
+
+    start = time.perf_counter()
+    results = [index.search(query, top_k) for query in queries]
+    seconds = (time.perf_counter() - start) / len(queries)
+
+    recall = np.mean([len(truth_set & set(result)) / top_k for truth_set, result in zip(truth, results)])
+    first_pass_bytes = corpus.nbytes if mode == "float32" else index.codes.nbytes
+    return recall, seconds, first_pass_bytes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    configs = [("float32", 1), ("int8", 2), ("int8", 4), ("binary", 5), ("binary", 10), ("binary", 20)]
+
+    print(f"{'rows':>7} {'mode':>8} {'oversample':>10} {'recall@' + str(args.top_k):>10} {'ms/query':>9} {'first-pass MB':>14}")
+    for size in args.sizes:
+        corpus = synthetic_corpus(size, args.dim, clusters=max(10, size // 100), rng=rng)
+        queries = queries_near(corpus, args.queries, rng)
+        for mode, oversampling in configs:
+            recall, seconds, nbytes = bench(corpus, queries, mode, oversampling, args.top_k)
+            print(f"{size:>7} {mode:>8} {oversampling:>10} {recall:>10.3f} {seconds * 1000:>9.3f} {nbytes / 1e6:>14.2f}")
@@ -71,6 +71,15 @@ class DatabaseManager:
             )
             conn.commit()
 
+    def append_transcript(self, meeting_id: str, data: str):
+        with self.get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE meetings SET transcript = COALESCE(transcript, '') || ? WHERE meeting_id = ?",
+                (data, meeting_id)
+            )
+            conn.commit()
+
     def get_primary_user(self, meeting_id: str) -> Optional[str]:
         with self.get_db() as conn:
             cursor = conn.cursor()
@@ -94,6 +103,36 @@ class DatabaseManager:
             )
             conn.commit()
 
+    def claim_primary(self, meeting_id: str, ws_id: str) -> Optional[str]:
+        """Make ws_id the primary unless the meeting already has one, returning the primary.
+        Only a registered connection can become primary, so this returns None when neither exists"""
+        with self.get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(
+                "SELECT ws_id FROM websocket_connections WHERE meeting_id = ? AND is_primary = TRUE",
+                (meeting_id,)
+            )
+            result = cursor.fetchone()
+            if result:
+                conn.commit()
+                return result['ws_id']
+            cursor.execute(
+                """
+                UPDATE websocket_connections 
+                SET is_primary = CASE WHEN ws_id = ? THEN TRUE ELSE FALSE END 
+                WHERE meeting_id = ?
+                """,
+                (ws_id, meeting_id)
+            )
+            cursor.execute(
+                "SELECT ws_id FROM websocket_connections WHERE meeting_id = ? AND is_primary = TRUE",
+                (meeting_id,)
+            )
+            result = cursor.fetchone()
+            conn.commit()
+            return result['ws_id'] if result else None
+
     def add_connection(self, ws_id: str, meeting_id: str, user_id: str):
         with self.get_db() as conn:
             cursor = conn.cursor()
@@ -0,0 +1,135 @@
+import logging
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Keeps the current primary if its connection is still registered, otherwise
+# hands the meeting to ARGV[1] if that connection is registered. Returns the
+# primary ws_id after the call, false when there is none.
+CLAIM_PRIMARY_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current and redis.call('HEXISTS', KEYS[2], current) == 1 then
+    return current
+end
+if redis.call('HEXISTS', KEYS[2], ARGV[1]) == 0 then
+    return false
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return ARGV[1]
+"""
+
+# Drops the primary only if it is still the given connection.
+RELEASE_PRIMARY_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisDatabaseManager:
+    """
+    Meeting state shared by every worker and host through Redis, with the same
+    interface as the SQLite DatabaseManager.
+
+    Per meeting it keeps a hash with the meeting metadata, a string the
+    transcript is APPENDed to, a hash of connections (ws_id -> user_id) and
+    the primary ws_id. Claiming the primary runs as a Lua script so two
+    connections racing on different nodes can't both become primary.
+    """
+
+    def __init__(self, redis_client, prefix="meeting_state", ttl=60 * 60 * 24):
+        self.redis = redis_client
+        self.prefix = prefix
+        self.ttl = ttl
+        self._claim_primary = self.redis.register_script(CLAIM_PRIMARY_SCRIPT)
+        self._release_primary = self.redis.register_script(RELEASE_PRIMARY_SCRIPT)
+
+    def _meeting_key(self, meeting_id: str) -> str:
+        return f"{self.prefix}:{meeting_id}"
+
+    def _transcript_key(self, meeting_id: str) -> str:
+        return f"{self.prefix}:{meeting_id}:transcript"
+
+    def _connections_key(self, meeting_id: str) -> str:
+        return f"{self.prefix}:{meeting_id}:connections"
+
+    def _primary_key(self, meeting_id: str) -> str:
+        return f"{self.prefix}:{meeting_id}:primary"
+
+    def _users_key(self, meeting_id: str) -> str:
+        return f"{self.prefix}:{meeting_id}:users"
+
+    def _ws_key(self, ws_id: str) -> str:
+        return f"{self.prefix}:ws:{ws_id}"
+
+    def get_meeting(self, meeting_id: str) -> Optional[dict]:
+        pipe = self.redis.pipeline()
+        pipe.hgetall(self._meeting_key(meeting_id))
+        pipe.get(self._transcript_key(meeting_id))
+        meeting, transcript = pipe.execute()
+        if not meeting:
+            return None
+        meeting = {key.decode(): value.decode() for key, value in meeting.items()}
+        meeting["transcript"] = transcript.decode() if transcript else ""
+        return meeting
+
+    def create_meeting(self, meeting_id: str):
+        key = self._meeting_key(meeting_id)
+        pipe = self.redis.pipeline()
+        pipe.hsetnx(key, "meeting_id", meeting_id)
+        pipe.hsetnx(key, "created_at", time.time())
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def update_transcript(self, meeting_id: str, transcript: str):
+        self.redis.set(self._transcript_key(meeting_id), transcript, ex=self.ttl)
+
+    def append_transcript(self, meeting_id: str, data: str):
+        key = self._transcript_key(meeting_id)
+        pipe = self.redis.pipeline()
+        pipe.append(key, data)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def get_primary_user(self, meeting_id: str) -> Optional[str]:
+        ws_id = self.redis.get(self._primary_key(meeting_id))
+        return ws_id.decode() if ws_id else None
+
+    def set_primary_user(self, meeting_id: str, ws_id: str):
+        self.redis.set(self._primary_key(meeting_id), ws_id, ex=self.ttl)
+
+    def claim_primary(self, meeting_id: str, ws_id: str) -> Optional[str]:
+        """Make a registered `ws_id` the primary unless a live primary exists, returning the primary."""
+        primary = self._claim_primary(
+            keys=[self._primary_key(meeting_id), self._connections_key(meeting_id)],
+            args=[ws_id, self.ttl],
+        )
+        return primary.decode() if isinstance(primary, bytes) else primary
+
+    def add_connection(self, ws_id: str, meeting_id: str, user_id: str):
+        connections_key = self._connections_key(meeting_id)
+        pipe = self.redis.pipeline()
+        pipe.hset(connections_key, ws_id, user_id)
+        pipe.expire(connections_key, self.ttl)
+        pipe.set(self._ws_key(ws_id), meeting_id, ex=self.ttl)
+        pipe.execute()
+
+    def remove_connection(self, ws_id: str):
+        meeting_id = self.redis.get(self._ws_key(ws_id))
+        if not meeting_id:
+            return
+        meeting_id = meeting_id.decode()
+        pipe = self.redis.pipeline()
+        pipe.hdel(self._connections_key(meeting_id), ws_id)
+        pipe.delete(self._ws_key(ws_id))
+        pipe.execute()
+        self._release_primary(keys=[self._primary_key(meeting_id)], args=[ws_id])
+
+    def add_user_to_meeting(self, meeting_id: str, user_id: str):
+        users_key = self._users_key(meeting_id)
+        pipe = self.redis.pipeline()
+        pipe.sadd(users_key, user_id)
+        pipe.expire(users_key, self.ttl)
+        pipe.execute()
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import weakref
+from typing import Any, Dict, List, Optional, TypedDict
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class LateMeetingRow(TypedDict, total=False):
+    id: str
+    meeting_id: str
+    user_ids: List[str]
+    meeting_start_time: float
+    transcript: Optional[str]
+    summary: Optional[str]
+    action_items: Optional[str]
+    meeting_title: Optional[str]
+    memories: List["MemoryRow"]
+
+
+class MeetingRow(TypedDict, total=False):
+    id: int
+    meeting_id: str
+    user_id: str
+    context_files: Optional[List[str]]
+    embeddings: Optional[List[str]]
+    chunks: Optional[List[str]]
+    suggestion_count: int
+
+
+class MemoryRow(TypedDict, total=False):
+    id: int
+    meeting_id: str
+    user_id: str
+    content: str
+
+
+class SupabaseError(Exception):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"PostgREST error {status_code}: {message}")
+        self.status_code = status_code
+
+
+class SupabaseData:
+    """
+    Async access to the Supabase tables used by the request handlers.
+
+    Talks to PostgREST directly over a pooled HTTP/2 httpx client, so handlers
+    never block the event loop on table calls. Point `rest_url` at a local
+    PostgREST instance to run against a stand-in database.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        key: str,
+        rest_url: Optional[str] = None,
+        timeout: float = 10.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        http2: bool = True,
+    ):
+        self.rest_url = (rest_url or f"{url}/rest/v1").rstrip("/")
+        self.headers = {"apikey": key, "Authorization": f"Bearer {key}"}
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.http2 = http2
+        # httpx clients are tied to the event loop they were first used on, so
+        # each loop gets its own and it goes away together with its loop
+        self._clients = weakref.WeakKeyDictionary()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                base_url=self.rest_url,
+                headers=self.headers,
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+            )
+            self._clients[loop] = client
+        return client
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, str]] = None,
+        json: Any = None,
+        prefer: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        headers = {"Prefer": prefer} if prefer else None
+        client = self._get_client()
+        response = await client.request(
+            method,
+            path,
+            params=params,
+            json=json,
+            headers=headers,
+            timeout=timeout if timeout is not None else self.timeout,
+        )
+        if response.status_code >= 400:
+            raise SupabaseError(response.status_code, response.text)
+        if not response.content:
+            return None
+        return response.json()
+
+    async def close(self):
+        """Close the client of the running loop, call it from that loop's shutdown."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    # late_meeting
+
+    async def get_late_meeting(self, meeting_id: str, columns: str = "id") -> Optional[LateMeetingRow]:
+        rows = await self._request(
+            "GET", "/late_meeting",
+            params={"select": columns, "meeting_id": f"eq.{meeting_id}"},
+        )
+        return rows[0] if rows else None
+
+    async def upsert_late_meeting(self, row: LateMeetingRow) -> LateMeetingRow:
+        rows = await self._request(
+            "POST", "/late_meeting",
+            params={"on_conflict": "meeting_id"},
+            json=row,
+            prefer="resolution=merge-duplicates,return=representation",
+        )
+        return rows[0]
+
+    async def update_late_meeting(self, meeting_obj_id: str, values: LateMeetingRow) -> Optional[LateMeetingRow]:
+        rows = await self._request(
+            "PATCH", "/late_meeting",
+            params={"id": f"eq.{meeting_obj_id}"},
+            json=values,
+            prefer="return=representation",
+        )
+        return rows[0] if rows else None
+
+    async def update_late_meeting_users(self, meeting_id: str, user_ids: List[str]):
+        await self._request(
+            "PATCH", "/late_meeting",
+            params={"meeting_id": f"eq.{meeting_id}"},
+            json={"user_ids": user_ids},
+            prefer="return=minimal",
+        )
+
+    # meetings
+
+    async def get_meeting_context(self, meeting_id: str, user_id: str, columns: str) -> Optional[MeetingRow]:
+        rows = await self._request(
+            "GET", "/meetings",
+            params={"select": columns, "meeting_id": f"eq.{meeting_id}", "user_id": f"eq.{user_id}"},
+        )
+        return rows[0] if rows else None
+
+    async def upsert_meeting(self, row: MeetingRow) -> MeetingRow:
+        rows = await self._request(
+            "POST", "/meetings",
+            params={"on_conflict": "meeting_id,user_id"},
+            json=row,
+            prefer="resolution=merge-duplicates,return=representation",
+        )
+        return rows[0]
+
+    async def update_meeting(self, meeting_id: str, user_id: str, values: MeetingRow) -> Optional[MeetingRow]:
+        rows = await self._request(
+            "PATCH", "/meetings",
+            params={"meeting_id": f"eq.{meeting_id}", "user_id": f"eq.{user_id}"},
+            json=values,
+            prefer="return=representation",
+        )
+        return rows[0] if rows else None
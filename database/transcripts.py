@@ -0,0 +1,132 @@
+import codecs
+import gzip
+import logging
+import threading
+import zlib
+from collections import OrderedDict
+from hashlib import sha256
+from typing import Iterator
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+CODECS = {
+    # codec: (file extension, content type)
+    # plain text, readable by anything fetching the public URL
+    "none": ("", "text/plain; charset=utf-8"),
+    # compressed objects must be read back with read_transcript or GET /transcript/:meeting_id
+    "gzip": ("gz", "application/gzip"),
+    "zstd": ("zst", "application/zstd"),
+}
+
+
+def _zstd():
+    try:
+        import zstandard  # optional, only needed for TRANSCRIPT_COMPRESSION=zstd
+    except ImportError:
+        raise RuntimeError("zstd transcript compression requires the zstandard package")
+    return zstandard
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == "none":
+        return data
+    if codec == "zstd":
+        return _zstd().ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def _decompressor(name: str):
+    if name.endswith(".zst"):
+        return _zstd().ZstdDecompressor().decompressobj()
+    if name.endswith(".gz"):
+        # wbits=31 expects a gzip header
+        return zlib.decompressobj(wbits=31)
+    # transcripts uploaded before compression was introduced
+    return None
+
+
+class TranscriptStore:
+    """
+    Stores transcripts in the storage bucket named by the sha256 of their
+    text, as plain text or compressed with `codec`. Identical transcripts map
+    to the same object, so a transcript that is already stored is never
+    uploaded again.
+    """
+
+    def __init__(self, supabase, bucket="transcripts", codec="none", known_size=10000):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown transcript codec {codec}")
+        self.supabase = supabase
+        self.bucket = bucket
+        self.codec = codec
+        self.known_size = known_size
+        # object names this process has already seen in the bucket
+        self._known = OrderedDict()
+        self._lock = threading.Lock()
+
+    def blob_name(self, data: bytes) -> str:
+        extension, _ = CODECS[self.codec]
+        name = f"{sha256(data).hexdigest()}.txt"
+        return f"{name}.{extension}" if extension else name
+
+    def store(self, transcript: str) -> str:
+        """Upload `transcript` unless it's already stored and return its public URL."""
+        data = transcript.encode("utf-8")
+        name = self.blob_name(data)
+        storage = self.supabase.storage.from_(self.bucket)
+
+        if not self._is_known(name) and not self._exists(name):
+            _, content_type = CODECS[self.codec]
+            try:
+                storage.upload(
+                    path=name,
+                    file=compress(data, self.codec),
+                    file_options={"content-type": content_type, "upsert": "false"},
+                )
+            except Exception as e:
+                # another worker uploaded the same transcript in the meantime
+                if "Duplicate" not in str(e) and "409" not in str(e):
+                    raise
+        self._remember(name)
+        return storage.get_public_url(name)
+
+    def _exists(self, name: str) -> bool:
+        files = self.supabase.storage.from_(self.bucket).list(options={"search": name, "limit": 1})
+        return any(item.get("name") == name for item in files or [])
+
+    def _is_known(self, name: str) -> bool:
+        with self._lock:
+            return name in self._known
+
+    def _remember(self, name: str):
+        with self._lock:
+            self._known[name] = True
+            self._known.move_to_end(name)
+            while len(self._known) > self.known_size:
+                self._known.popitem(last=False)
+
+
+def iter_transcript(url: str, chunk_size: int = 64 * 1024) -> Iterator[str]:
+    """Stream a stored transcript, decompressing and decoding it chunk by chunk."""
+    decompressor = _decompressor(url.split("?")[0])
+    decoder = codecs.getincrementaldecoder("utf-8")()
+
+    with httpx.stream("GET", url, timeout=30.0) as response:
+        response.raise_for_status()
+        for chunk in response.iter_raw(chunk_size):
+            if decompressor is not None:
+                chunk = decompressor.decompress(chunk)
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+
+    tail = decompressor.flush() if decompressor is not None and hasattr(decompressor, "flush") else b""
+    text = decoder.decode(tail, final=True)
+    if text:
+        yield text
+
+
+def read_transcript(url: str) -> str:
+    return "".join(iter_transcript(url))
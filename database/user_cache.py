@@ -0,0 +1,83 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from utils.process_local import OncePerProcess
+
+logger = logging.getLogger(__name__)
+
+# every users column the backend reads, fetched together in one query
+USER_PROFILE_COLUMNS = "id, email, memory_enabled, emails_enabled"
+INVALIDATION_CHANNEL = "user_profile:invalidate"
+
+
+class UserProfileCache:
+    """
+    Per-process TTL cache of user profiles.
+
+    Entries expire after `ttl` seconds. When a user changes their settings, an
+    invalidation published on INVALIDATION_CHANNEL drops the entry in every
+    worker that subscribed through Redis pub/sub.
+    """
+
+    def __init__(self, supabase, redis_client=None, ttl=300, max_size=10000):
+        self.supabase = supabase
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # one subscriber thread per worker process, started on first use
+        self._listener = OncePerProcess(self._start_listener)
+
+    def get(self, user_id: str) -> Optional[dict]:
+        """Profile row for `user_id`, or None if no such user exists."""
+        if self.redis_client is not None:
+            self._listener.ensure()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+
+        result = self.supabase.table("users").select(USER_PROFILE_COLUMNS).eq("id", user_id).execute()
+        profile = result.data[0] if result.data else None
+
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, profile)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return profile
+
+    def invalidate(self, user_id: str, broadcast: bool = True):
+        with self._lock:
+            self._entries.pop(user_id, None)
+        if broadcast and self.redis_client is not None:
+            try:
+                self.redis_client.publish(INVALIDATION_CHANNEL, user_id)
+            except Exception as e:
+                logger.error(f"Failed to broadcast profile invalidation for {user_id}: {str(e)}")
+
+    def _start_listener(self):
+        threading.Thread(target=self._listen, name="user-profile-invalidation", daemon=True).start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                for message in pubsub.listen():
+                    user_id = message["data"]
+                    if isinstance(user_id, bytes):
+                        user_id = user_id.decode()
+                    self.invalidate(user_id, broadcast=False)
+            except Exception as e:
+                logger.error(f"Profile invalidation listener failed, resubscribing: {str(e)}")
+                # entries may have missed an invalidation while disconnected
+                with self._lock:
+                    self._entries.clear()
+                time.sleep(5)
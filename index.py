@@ -1,34 +1,46 @@
 from robyn.robyn import Request
-from sklearn.metrics.pairwise import cosine_similarity
 from supabase import create_client, Client
 import supabase
-from openai import OpenAI
 import requests
 import json
 import os
 import time
 import numpy as np
 from hashlib import sha256
+import hmac
 from typing import List, Optional
-from groq import Groq
 import uuid
-import fitz
+import weakref
 from dotenv import load_dotenv
-from io import BytesIO
-from PyPDF2 import PdfReader
 from robyn import Robyn, ALLOW_CORS, WebSocket, Response, Request
 from robyn.types import Body
 import logging
 from database.db_manager import DatabaseManager
+from database.redis_manager import RedisDatabaseManager
+from database.supabase_async import SupabaseData
+from database.transcripts import TranscriptStore, read_transcript
+from database.user_cache import UserProfileCache
+from realtime.broadcast import MeetingBroadcaster
+from realtime.latest_wins import LatestWinsScheduler
+from ai.latency import Hedger, timed
+from ai.providers import ProviderRegistry
+from ai.question_detector import QuestionDetector
+from ai.suggestion_cache import SemanticSuggestionCache
+from utils.idempotency import IdempotencyInProgress, IdempotencyStore, request_key
+from utils.markdown import markdown_to_html
+from ai.router import DEFAULT_ROUTES, ModelRouter, TaskRoute, estimate_tokens
+from retrieval.bm25 import BM25Cache, reciprocal_rank_fusion
+from retrieval.context_packer import ContextPacker
+from retrieval.projection import ProjectionStore
+from retrieval.quantization import QuantizedIndexCache, RedisVectors
+from workers.analytics import EventBuffer
+from workers.background import BackgroundExecutor, BackgroundQueueFull, TaskPolicy
+from workers.offload import Offloader
+from workers.parsing import get_chunks, pdf_chunks
 from functools import lru_cache
 import asyncio
+import threading
 import redis
-from mistralai import Mistral
-import re
-import multiprocessing
-from google import genai
-from google.genai import types
-import groq
 
 
 redis_user = os.getenv("REDIS_USERNAME")
@@ -56,22 +68,130 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-# Initialize database manager
-db = DatabaseManager()
+# Initialize database manager, MEETING_STATE_BACKEND=redis shares meeting state
+# across workers and hosts instead of keeping it in a local SQLite file
+if os.getenv("MEETING_STATE_BACKEND", "sqlite") == "redis":
+    db = RedisDatabaseManager(redis_client, ttl=CACHE_EXPIRATION)
+else:
+    db = DatabaseManager()
 
 openai_api_key = os.getenv("OPENAI_API_KEY")
 groq_api_key = os.getenv("GROQ_API_KEY")
 gemini_api_key = os.getenv("GEMINI_API_KEY")
 
+
+# provider SDKs are imported and their clients built on first use, see start_warm_up
+def create_openai_client():
+    from openai import OpenAI
+    return OpenAI(api_key=openai_api_key, timeout=llm_timeout)
+
+
+def create_groq_client():
+    from groq import Groq
+    return Groq(api_key=groq_api_key, timeout=llm_timeout)
+
+
+def create_gemini_client():
+    from google import genai
+    # milliseconds here
+    return genai.Client(api_key=gemini_api_key, http_options={"timeout": int(llm_timeout * 1000)})
+
+
+def create_mistral_client():
+    from mistralai import Mistral
+    return Mistral(api_key=os.getenv("MISTRAL_API_KEY"))
+
+
+def create_fastembed_model():
+    from fastembed import TextEmbedding  # Import fastembed only when running project locally
+    return TextEmbedding(model_name="BAAI/bge-base-en")
+
+
+providers = ProviderRegistry()
+providers.register("openai", create_openai_client)
+providers.register("groq", create_groq_client)
+providers.register("gemini", create_gemini_client)
+providers.register("mistral", create_mistral_client)
+providers.register("fastembed", create_fastembed_model)
+
+hedging_enabled = os.getenv("LLM_HEDGING", "false").lower() == "true"
+hedge_default_delay = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", 8))
+# per-call provider timeout, so a hedged call that lost doesn't hold its thread indefinitely
+llm_timeout = float(os.getenv("LLM_TIMEOUT", 60))
+
+# per-task model candidates or tiers, with hedging turned off per task by the object form, e.g.
+# LLM_ROUTES='{"title": ["llama-3.3", "gpt-4o"], "summarize": [{"name": "small", "models": ["gemini-2.0-flash"], "max_tokens": 8000}, {"name": "large", "models": ["gemini-1.5-pro"]}], "notes": {"hedge": false, "tiers": ["llama-3.3", "gpt-4o"]}}'
+llm_routes = dict(DEFAULT_ROUTES)
+for task, config in json.loads(os.getenv("LLM_ROUTES") or "{}").items():
+    llm_routes[task] = TaskRoute.from_config(config)
+
+
 class AIClientAdapter:
     def __init__(self, client_mode, ollama_url):
         self.client_mode = client_mode
         self.ollama_url = f"{ollama_url}/api/chat"
-        self.openai_client = OpenAI(api_key=openai_api_key)
-        self.groq_client = Groq(api_key=groq_api_key)
-        self.gemini_client = genai.Client(api_key=gemini_api_key)
+        self.router = ModelRouter(
+            routes=llm_routes,
+            failure_threshold=int(os.getenv("LLM_CIRCUIT_FAILURES", 5)),
+            reset_timeout=float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", 30)),
+        )
+        self.hedger = Hedger(max_workers=int(os.getenv("LLM_HEDGE_WORKERS", 16)))
+
+    def task_completions_create(self, task, messages, temperature=0.2, response_format=None):
+        """
+        Route a logical task ("summarize", "title", "needs_help", "suggest", ...) to
+        the fastest healthy model that fits the input, failing over down the
+        candidate list and hedging against the next candidate when enabled.
+        """
+        candidates = self.router.route(task, estimate_tokens(messages))
+        if self.client_mode != "ONLINE":
+            return self.chat_completions_create(candidates[0], messages, temperature, response_format, task=task)
+
+        hedge = self.router.routes[task].hedge
+        last_error = None
+        tried = set()
+        for model in candidates:
+            if model in tried or not self.router.breaker(model).allow():
+                continue
+            tried.add(model)
+            # never hedge onto a model already tried or whose breaker is open
+            hedge_model = next(
+                (other for other in candidates if other not in tried and self.router.breaker(other).is_available()), None
+            ) if hedge and hedging_enabled else None
+            try:
+                return self.chat_completions_create(model, messages, temperature, response_format, hedge_model=hedge_model, task=task)
+            except Exception as e:
+                logger.warning(f"Model {model} failed for task {task}: {str(e)}")
+                last_error = e
+                if hedge_model is not None:
+                    # the hedge is always fired once the primary fails, so it failed as well
+                    tried.add(hedge_model)
+
+        if last_error is None:
+            # every breaker refused the call, try the preferred model anyway
+            return self.chat_completions_create(candidates[0], messages, temperature, response_format, task=task)
+        raise last_error
+
+    def chat_completions_create(self, model, messages, temperature=0.2, response_format=None, hedge_model=None, task=None):
+        """
+        Run a chat completion and record its latency. If `hedge_model` is set and
+        the primary hasn't answered within its observed p90, the same request is
+        fired at `hedge_model` and the first answer wins.
+        """
+        def call(target):
+            return timed(
+                self.router,
+                target,
+                lambda: self._chat_completions_create(target, messages, temperature, response_format, task=task)
+            )
 
-    def chat_completions_create(self, model, messages, temperature=0.2, response_format=None):
+        if not hedging_enabled or not hedge_model or hedge_model == model or self.client_mode != "ONLINE":
+            return call(model)()
+
+        delay = self.router.latency.percentile(model, 90) or hedge_default_delay
+        return self.hedger.call(call(model), call(hedge_model), delay)
+
+    def _chat_completions_create(self, model, messages, temperature=0.2, response_format=None, task=None):
         # expect llama3.2 as the model name
         local = {
             "llama3.2": "llama3.2",
@@ -79,7 +199,8 @@ class AIClientAdapter:
         }
         groq = {
             "llama-3.3": "llama-3.3-70b-versatile",
-            "llama-3.2": "llama3-70b-8192"
+            "llama-3.2": "llama3-70b-8192",
+            "llama-3.1-8b": "llama-3.1-8b-instant"
         }
         gemini = {
             "gemini-1.5-flash": "gemini-1.5-flash",
@@ -90,28 +211,30 @@ class AIClientAdapter:
             # Use Ollama client
             data = {
                 "messages": messages,
-                "model": local[model],
+                "model": local.get(model, "llama3.2"),
                 "stream": False,
             }
-            response = requests.post(self.ollama_url, json=data)
+            response = requests.post(self.ollama_url, json=data, timeout=llm_timeout)
             return json.loads(response.text)["message"]["content"]
         elif self.client_mode == "ONLINE":
             # Use OpenAI or Groq client based on the model
             if "gpt" in model:
-                return self.openai_client.chat.completions.create(
+                return providers.get("openai").chat.completions.create(
                     model=model,
                     messages=messages,
                     temperature=temperature,
                     response_format=response_format
                 ).choices[0].message.content
             elif "llama" in model:
-                return self.groq_client.chat.completions.create(
+                return providers.get("groq").chat.completions.create(
                     model=groq[model],
                     messages=messages,
                     temperature=temperature,
                     response_format=response_format
                 ).choices[0].message.content
             elif "gemini" in model:
+                from google.genai import types
+
                 system_instruction = messages[0]["content"]
                 transcript = messages[1]["content"]
 
@@ -124,39 +247,59 @@ class AIClientAdapter:
                     ),
                 ]
 
+                if task != "summarize":
+                    # only the summary has a Gemini schema, other tasks get plain generation
+                    response = providers.get("gemini").models.generate_content(
+                        model=gemini[model],
+                        contents=contents,
+                        config=types.GenerateContentConfig(
+                            temperature=temperature,
+                            response_mime_type="application/json" if response_format else None,
+                            system_instruction=[
+                                types.Part.from_text(text=system_instruction),
+                            ],
+                        ),
+                    ).text
+
+                    return response
+
                 generate_content_config = types.GenerateContentConfig(
                     temperature=1,
                     top_p=0.95,
                     top_k=40,
                     response_mime_type="application/json",
-                    response_schema=genai.types.Schema(
-                        type=genai.types.Type.OBJECT,
-                        required=["action_items_list", "notes"],
+                    response_schema=types.Schema(
+                        type=types.Type.OBJECT,
+                        required=["action_items_list", "notes", "title"],
                         properties={
-                            "action_items_list": genai.types.Schema(
-                                type=genai.types.Type.ARRAY,
-                                items=genai.types.Schema(
-                                    type=genai.types.Type.OBJECT,
+                            "action_items_list": types.Schema(
+                                type=types.Type.ARRAY,
+                                items=types.Schema(
+                                    type=types.Type.OBJECT,
                                     required=["name", "action_items_list_html"],
                                     properties={
-                                        "name": genai.types.Schema(
-                                            type=genai.types.Type.STRING,
+                                        "name": types.Schema(
+                                            type=types.Type.STRING,
                                             description="Person's name",
                                         ),
-                                        "action_items_list_html": genai.types.Schema(
-                                            type=genai.types.Type.ARRAY,
-                                            items=genai.types.Schema(
-                                                type=genai.types.Type.STRING,
+                                        "action_items_list_html": types.Schema(
+                                            type=types.Type.ARRAY,
+                                            items=types.Schema(
+                                                type=types.Type.STRING,
                                                 description="HTML list item (<li>action item</li>)",
                                             ),
                                         ),
                                     },
                                 ),
                             ),
-                            "notes": genai.types.Schema(
-                                type=genai.types.Type.STRING,
+                            "notes": types.Schema(
+                                type=types.Type.STRING,
                                 description="Meeting notes in Markdown format",
                             ),
+                            "title": types.Schema(
+                                type=types.Type.STRING,
+                                description="Concise meeting title, at most 10 words",
+                            ),
                         },
                     ),
                     system_instruction=[
@@ -164,7 +307,7 @@ class AIClientAdapter:
                     ],
                 )
 
-                response = self.gemini_client.models.generate_content(
+                response = providers.get("gemini").models.generate_content(
                     model=gemini[model],
                     contents=contents,
                     config=generate_content_config,
@@ -174,24 +317,18 @@ class AIClientAdapter:
 
 class EmbeddingAdapter:
     def __init__(self, client_mode):
+        # fastembed (LOCAL) or Mistral (ONLINE) is built on the first embedding
         self.client_mode = client_mode
-        
-        if self.client_mode == "LOCAL":
-            from fastembed import TextEmbedding  # Import fastembed only when running project locally
-            self.fastembed_model = TextEmbedding(model_name="BAAI/bge-base-en")
-        elif self.client_mode == "ONLINE":
-            # Initialize Mistral client instead of MixedbreadAI
-            self.mistral_client = Mistral(api_key=os.getenv("MISTRAL_API_KEY"))
 
     def embeddings(self, text):
         if self.client_mode == "LOCAL":
             # Use the fastembed model to generate embeddings
-            result = np.array(list(self.fastembed_model.embed([text])))[-1].tolist()
+            result = np.array(list(providers.get("fastembed").embed([text])))[-1].tolist()
             return result
         elif self.client_mode == "ONLINE":
             # Use the Mistral client to generate embeddings
             model = "mistral-embed"
-            response = self.mistral_client.embeddings.create(
+            response = providers.get("mistral").embeddings.create(
                 model=model,
                 inputs=[text]
             )
@@ -202,6 +339,29 @@ class EmbeddingAdapter:
 client_mode = os.getenv("CLIENT_MODE")
 ollama_url = os.getenv("OLLAMA_ENDPOINT", "http://localhost:11434")
 ai_client = AIClientAdapter(client_mode, ollama_url)
+
+# local question check ahead of the needs_help call, "shadow" only measures it against the LLM
+question_detector = QuestionDetector.from_config(
+    mode=os.getenv("QUESTION_DETECTOR_MODE", "shadow"),
+    threshold=float(os.getenv("QUESTION_DETECTOR_THRESHOLD", 0.9)),
+    weights_path=os.getenv("QUESTION_DETECTOR_WEIGHTS"),
+)
+
+# suggestions of rephrased questions, per meeting and user since their context files differ
+suggestion_cache = SemanticSuggestionCache(
+    threshold=float(os.getenv("SUGGESTION_CACHE_THRESHOLD", 0.92)),
+    ttl=float(os.getenv("SUGGESTION_CACHE_TTL", 900)),
+    max_entries=int(os.getenv("SUGGESTION_CACHE_SIZE", 64)),
+)
+
+# one check_suggestion pipeline per meeting and user, a newer message cancels the older one
+suggestion_scheduler = LatestWinsScheduler(
+    debounce=float(os.getenv("SUGGESTION_DEBOUNCE", 0)),
+    cooldown=float(os.getenv("SUGGESTION_COOLDOWN", 0)),
+    cooldown_when=lambda response: bool(response.get("generated_suggestion")),
+)
+# scheduler key of each socket's suggestions, by ws.id
+suggestion_keys = {}
 embedding_client = EmbeddingAdapter(client_mode)
 
 app = Robyn(__file__)
@@ -215,221 +375,110 @@ url = os.getenv("SUPABASE_URL")
 key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 supabase: Client = create_client(url, key)
 
+# lexical indexes over uploaded file chunks, fused with vector search in check_suggestion
+bm25_indexes = BM25Cache(max_entries=int(os.getenv("BM25_CACHE_SIZE", 1000)))
+# chunk embeddings for vector search; with int8 or binary the first pass scans quantized codes
+# and the float32 rows only rescore the candidates, either in memory or fetched from Redis
+vector_indexes = QuantizedIndexCache(
+    mode=os.getenv("EMBEDDING_QUANTIZATION", "float32"),
+    max_entries=int(os.getenv("VECTOR_CACHE_SIZE", 1000)),
+    full_factory=(
+        lambda key, fingerprint, vectors: RedisVectors(
+            redis_client, f"embeddings:{key[0]}:{key[1]}:{fingerprint}", vectors, ttl=CACHE_EXPIRATION
+        )
+    ) if os.getenv("EMBEDDING_RESCORE_STORE", "memory") == "redis" else None,
+    # the active projection fitted by scripts/fit_projection.py, if enabled, reduces
+    # the vectors the first pass scans
+    projections=ProjectionStore(
+        supabase, ttl=float(os.getenv("EMBEDDING_PROJECTION_TTL", 300))
+    ) if os.getenv("EMBEDDING_PROJECTION", "off") == "active" else None,
+)
+# fits the retrieved chunks of a suggestion prompt into a fixed token budget
+context_packer = ContextPacker(
+    token_budget=int(os.getenv("SUGGESTION_CONTEXT_TOKENS", 200)),
+    diversity=float(os.getenv("SUGGESTION_CONTEXT_DIVERSITY", 0.3)),
+)
+# past this the suggestion is retrieved lexically instead of waiting on the embedding provider
+embedding_timeout = float(os.getenv("EMBEDDING_TIMEOUT", 2))
+
+# async data access for the request handlers, the sync client above is kept for
+# storage and for work running on background threads
+db_async = SupabaseData(
+    url,
+    key,
+    rest_url=os.getenv("SUPABASE_REST_URL"),
+    timeout=float(os.getenv("SUPABASE_TIMEOUT", 10)),
+    max_connections=int(os.getenv("SUPABASE_MAX_CONNECTIONS", 100)),
+)
+
+# transcripts are stored content addressed, as plain text unless TRANSCRIPT_COMPRESSION
+# is set, compressed ones are read back through GET /transcript/:meeting_id
+transcript_store = TranscriptStore(supabase, codec=os.getenv("TRANSCRIPT_COMPRESSION", "none"))
+
+background = BackgroundExecutor(
+    workers=int(os.getenv("BACKGROUND_WORKERS", 4)),
+    max_queue=int(os.getenv("BACKGROUND_QUEUE_SIZE", 200)),
+    policies={
+        # embeds the memory once, then hands the write to memory_write
+        "memory_storage": TaskPolicy(retries=2, backoff=2.0),
+        # store_memory upserts on (meeting_id, user_id), so retrying after a lost
+        # response overwrites the memory row instead of duplicating it
+        "memory_write": TaskPolicy(retries=3, backoff=2.0),
+        "transcript_upload": TaskPolicy(retries=3, backoff=2.0),
+        "emails": TaskPolicy(retries=2, backoff=5.0),
+    },
+)
+background_submit_timeout = float(os.getenv("BACKGROUND_SUBMIT_TIMEOUT", 5))
+
+# blocking calls made from handlers go through here instead of running on the event loop
+offload = Offloader(
+    cpu_workers=int(os.getenv("OFFLOAD_CPU_WORKERS", 2)),
+    limits=json.loads(os.getenv("OFFLOAD_LIMITS") or "{}"),
+)
+
+analytics_buffer = EventBuffer(
+    lambda events: supabase.table("analytics").insert(events).execute(),
+    batch_size=int(os.getenv("ANALYTICS_BATCH_SIZE", 500)),
+    flush_interval=float(os.getenv("ANALYTICS_FLUSH_INTERVAL", 5)),
+    max_size=int(os.getenv("ANALYTICS_BUFFER_SIZE", 10000)),
+    redis_client=redis_client if os.getenv("ANALYTICS_BUFFER", "memory") == "redis" else None,
+)
+
+# retried /end_meeting and /update_meeting_obj calls share the first call's result
+# instead of generating and storing everything again
+idempotency = IdempotencyStore(
+    redis_client,
+    ttl=int(os.getenv("IDEMPOTENCY_TTL", CACHE_EXPIRATION)),
+    lock_ttl=int(os.getenv("IDEMPOTENCY_LOCK_TTL", 300)),
+    wait=float(os.getenv("IDEMPOTENCY_WAIT", 10)),
+    run_blocking=lambda fn, *args, **kwargs: offload.run("redis", fn, *args, **kwargs),
+)
+
+
+def in_progress_response(e: IdempotencyInProgress) -> Response:
+    return Response(
+        status_code=409,
+        description=json.dumps({"status": "in_progress"}),
+        headers={"Content-Type": "application/json", "Retry-After": str(max(1, round(e.retry_after)))}
+    )
+
+# pushes transcript and summary updates to every socket of a meeting, on all workers
+broadcaster = MeetingBroadcaster(redis_client, queue_size=int(os.getenv("BROADCAST_QUEUE_SIZE", 100)))
+# serializes transcript appends per meeting, entries go away once no message holds them
+transcript_locks = weakref.WeakValueDictionary()
+
+user_profiles = UserProfileCache(
+    supabase,
+    redis_client,
+    ttl=float(os.getenv("USER_PROFILE_CACHE_TTL", 300)),
+)
+
 
 def parse_array_string(s):
     # Remove brackets and split in one operation
     return np.fromstring(s[1:-1], sep=',', dtype=float)
 
 
-def markdown_to_html(markdown: str) -> str:
-    # yes, I've built our own markdown to html converter.
-
-    """
-    Convert a Markdown string to an HTML string, without using third-party libraries.
-    Supports a large subset of core Markdown features:
-      - Headings
-      - Bold, italic
-      - Inline code
-      - Fenced code blocks
-      - Links, images
-      - Blockquotes
-      - Unordered and ordered lists
-      - Horizontal rules
-      - Paragraphs
-    """
-    # Split input into lines
-    lines = markdown.split('\n')
-    
-    # State variables
-    in_code_block = False
-    code_block_delimiter = None
-    code_lines = []
-    paragraph_lines = []
-    html_output = []
-    
-    def flush_paragraph():
-        """Close out the current paragraph buffer and convert it into an HTML <p> block."""
-        if paragraph_lines:
-            # Join all paragraph lines with a space, then run inline parsing.
-            paragraph_text = ' '.join(paragraph_lines)
-            paragraph_text = parse_inline(paragraph_text)
-            html_output.append(f"<p>{paragraph_text}</p>")
-            paragraph_lines.clear()
-    
-    def parse_inline(text: str) -> str:
-        """
-        Perform inline replacements for:
-         - Images: ![alt](url)
-         - Links: [text](url)
-         - Bold: **text** or __text__
-         - Italic: *text* or _text_
-         - Inline code: `code`
-        """
-        # Images
-        text = re.sub(
-            r'!\[([^\]]*)\]\(([^)]+)\)',
-            r'<img alt="\1" src="\2">',
-            text
-        )
-        # Links
-        text = re.sub(
-            r'\[([^\]]+)\]\(([^)]+)\)',
-            r'<a href="\2">\1</a>',
-            text
-        )
-        # Bold (greedy match for ** or __)
-        text = re.sub(
-            r'(\*\*|__)(.+?)\1',
-            r'<strong>\2</strong>',
-            text
-        )
-        # Italic (greedy match for * or _)
-        text = re.sub(
-            r'(\*|_)(.+?)\1',
-            r'<em>\2</em>',
-            text
-        )
-        # Inline code
-        text = re.sub(
-            r'`([^`]+)`',
-            r'<code>\1</code>',
-            text
-        )
-        return text
-    
-    i = 0
-    while i < len(lines):
-        line = lines[i]
-        
-        # Check for fenced code block (start or end)
-        fence_match = re.match(r'^(```|~~~)\s*$', line)
-        if fence_match:
-            fence = fence_match.group(1)
-            if not in_code_block:
-                # Entering code block
-                flush_paragraph()
-                in_code_block = True
-                code_block_delimiter = fence
-                code_lines = []
-            else:
-                # Exiting code block
-                if fence == code_block_delimiter:
-                    in_code_block = False
-                    # Escape HTML special chars inside code
-                    escaped_code = '\n'.join(code_lines)
-                    escaped_code = (
-                        escaped_code
-                        .replace('&', '&amp;')
-                        .replace('<', '&lt;')
-                        .replace('>', '&gt;')
-                    )
-                    html_output.append(f"<pre><code>{escaped_code}</code></pre>")
-            i += 1
-            continue
-        
-        # If we're currently in a fenced code block, gather lines until fence end
-        if in_code_block:
-            code_lines.append(line)
-            i += 1
-            continue
-        
-        # Check for headings: (#{1,6} + text)
-        heading_match = re.match(r'^(#{1,6})\s+(.*)', line)
-        if heading_match:
-            flush_paragraph()
-            level = len(heading_match.group(1))
-            heading_text = parse_inline(heading_match.group(2))
-            html_output.append(f"<h{level}>{heading_text}</h{level}>")
-            i += 1
-            continue
-        
-        # Check for horizontal rule
-        hr_match = re.match(r'^(\*[\s\*]*|\-[\s\-]*|_[\s_]*)$', line.strip())
-        if hr_match:
-            # Heuristically requires 3 or more symbols to be valid
-            # We'll do a simpler check by removing spaces and verifying length >= 3
-            chars_only = re.sub(r'\s+', '', line)
-            if len(chars_only) >= 3:
-                flush_paragraph()
-                html_output.append("<hr/>")
-                i += 1
-                continue
-        
-        # Check for blockquote
-        bq_match = re.match(r'^>\s?(.*)', line)
-        if bq_match:
-            flush_paragraph()
-            # Accumulate blockquote lines
-            quote_lines = [bq_match.group(1)]
-            j = i + 1
-            while j < len(lines):
-                next_line = lines[j]
-                next_bq = re.match(r'^>\s?(.*)', next_line)
-                if next_bq:
-                    quote_lines.append(next_bq.group(1))
-                    j += 1
-                else:
-                    break
-            # Recursively parse the blockquote content
-            inner_html = markdown_to_html('\n'.join(quote_lines))
-            html_output.append(f"<blockquote>{inner_html}</blockquote>")
-            i = j
-            continue
-        
-        # Check for lists (unordered or ordered)
-        # Unordered: -, +, or * at start
-        # Ordered: number followed by a period
-        ul_match = re.match(r'^(\*|\-|\+)\s+(.*)', line)
-        ol_match = re.match(r'^(\d+)\.\s+(.*)', line)
-        if ul_match or ol_match:
-            flush_paragraph()
-            # Determine list type
-            if ul_match:
-                list_tag = "ul"
-            else:
-                list_tag = "ol"
-            list_buffer = []
-            
-            # Gather subsequent lines
-            while i < len(lines):
-                l = lines[i]
-                # Check if we still match the same type of list
-                if list_tag == "ul":
-                    m = re.match(r'^(\*|\-|\+)\s+(.*)', l)
-                else:
-                    m = re.match(r'^(\d+)\.\s+(.*)', l)
-                
-                if m:
-                    item_content = m.group(2)
-                    list_buffer.append(item_content)
-                    i += 1
-                else:
-                    break
-            
-            # Convert the gathered lines into list items
-            html_output.append(f"<{list_tag}>")
-            for item in list_buffer:
-                html_output.append(f"  <li>{parse_inline(item)}</li>")
-            html_output.append(f"</{list_tag}>")
-            continue
-        
-        # If the line is empty, it signals a paragraph break
-        if not line.strip():
-            flush_paragraph()
-            i += 1
-            continue
-        
-        # Otherwise, treat it as part of a paragraph
-        paragraph_lines.append(line.strip())
-        i += 1
-    
-    # Flush any remaining paragraph at the end
-    flush_paragraph()
-    
-    # Join everything into one HTML string
-    return "\n".join(html_output)
-
-
 @app.exception
 def handle_exception(error):
     logger.error(f"Application error: {str(error)}", exc_info=True)
@@ -437,6 +486,32 @@ def handle_exception(error):
 
 
 
+# peers whose X-Real-IP header is believed, e.g. the affinity proxy (python -m realtime.affinity)
+trusted_proxies = {ip.strip() for ip in os.getenv("TRUSTED_PROXIES", "127.0.0.1,::1").split(",") if ip.strip()}
+
+
+def client_ip(request: Request) -> str:
+    """Address of the client, taken from X-Real-IP when the request came through a trusted proxy"""
+    if request.ip_addr in trusted_proxies:
+        forwarded = request.headers.get("x-real-ip") or request.headers.get("X-Real-IP")
+        if forwarded:
+            return forwarded
+    return request.ip_addr
+
+
+# shared secret for internal calls such as /invalidate_user, those endpoints refuse everything when unset
+internal_api_token = os.getenv("INTERNAL_API_TOKEN", "")
+
+
+def is_internal_request(request: Request) -> bool:
+    """Whether the request carries INTERNAL_API_TOKEN as its bearer token"""
+    if not internal_api_token:
+        return False
+    authorization = request.headers.get("authorization") or request.headers.get("Authorization") or ""
+    scheme, _, token = authorization.partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(token.strip(), internal_api_token)
+
+
 def get_cache_key(transcript: str) -> str:
     """Generate a deterministic cache key from the transcript"""
     return f"transcript:{sha256(transcript.encode()).hexdigest()}"
@@ -485,15 +560,15 @@ def extract_action_items(transcript):
 
         try:
             # Sending the prompt to the AI model using chat completions
-            response = ai_client.chat_completions_create(
-                model="llama-3.3",
+            response = ai_client.task_completions_create(
+                task="action_items",
                 messages=messages,
                 temperature=0.2,
                 response_format={"type": "json_object"}
             )
         except Exception as e:
             if "failed_generation" in str(e):
-                new_error: groq.BadRequestError = e
+                new_error = e  # groq.BadRequestError
                 response = new_error.response.text
             else:
                 return "No action items found."
@@ -546,8 +621,8 @@ def extract_action_items(transcript):
                 ]
 
             try:
-                response = ai_client.chat_completions_create(
-                    model="llama-3.3",
+                response = ai_client.task_completions_create(
+                    task="action_items",
                     messages=messages,
                     temperature=0.2,
                     response_format={"type": "json_object"}
@@ -593,8 +668,6 @@ def chunk_text(text, words_per_chunk=50000):
 
 
 def generate_everything(transcript):
-    model = "gemini-1.5-pro"
-    
     system_instruction = """You are an executive assistant tasked with extracting action items and taking notes from a meeting transcript. Try to be as accurate as possible. And keep the notes concise and to the point.
 
                 For action items: For each person involved in the transcript, list their name with their respective action items, or don't list the person if there are no action items for that person.
@@ -632,7 +705,9 @@ def generate_everything(transcript):
                 \n**Key Points:**\n
                 - Option was fully received and confirmed.
                 - System is confirmed to be running properly.
-                - Network is functioning correctly."""
+                - Network is functioning correctly.
+
+                For title: Generate a concise meeting title. Use the participants' names and the meeting date when available. Keep the title relevant and limited to 10 words."""
     
     user_message = f"Here's the transcript: {transcript}"
 
@@ -647,10 +722,10 @@ def generate_everything(transcript):
         }
     ]
 
-    response = ai_client.chat_completions_create(
-        model=model,
+    response = ai_client.task_completions_create(
+        task="summarize",
         messages=messages,
-        temperature=0.2,
+        temperature=0.2
     )
 
     summary = json.loads(response)
@@ -667,7 +742,8 @@ def generate_everything(transcript):
 
     result = {
         "action_items": action_items,
-        "notes": notes_content
+        "notes": notes_content,
+        "title": summary.get("title")
     }
 
     return result
@@ -708,8 +784,8 @@ def generate_notes(transcript):
         ]
 
         try:
-            response = ai_client.chat_completions_create(
-                model="llama-3.3",
+            response = ai_client.task_completions_create(
+                task="notes",
                 messages=messages,
                 temperature=0.2,
                 response_format={"type": "json_object"}
@@ -772,8 +848,8 @@ def generate_notes(transcript):
                 ]
 
             try:
-                response = ai_client.chat_completions_create(
-                    model="llama-3.3",
+                response = ai_client.task_completions_create(
+                    task="notes",
                     messages=messages,
                     temperature=0.2,
                     response_format={"type": "json_object"}
@@ -784,7 +860,7 @@ def generate_notes(transcript):
             
             except Exception as e:
                 if "failed_generation" in str(e):
-                    new_error: groq.BadRequestError = e
+                    new_error = e  # groq.BadRequestError
                     tmp_notes = new_error.response.text
                     continue
                 else:
@@ -814,9 +890,8 @@ def generate_title(summary):
         }
     ]
 
-    response = ai_client.chat_completions_create(
-        model="gpt-4o",
-        # model="gpt-4o",
+    response = ai_client.task_completions_create(
+        task="title",
         messages=messages,
         temperature=0.2,
         response_format={"type": "json_object"}
@@ -1441,37 +1516,15 @@ def send_email(email, email_type, **kwargs):
     return {"type": "success", "error": None}
 
 
-def extract_text(file_path):
-    with fitz.open(file_path) as pdf_document:
-        text = ""
-        for page_num in range(pdf_document.page_count):
-            page = pdf_document[page_num]
-            text += page.get_text()
-    return text
-
-
-def get_chunks(text):
-    max_chars = 200
-    overlap = 50
-    
-    chunks = []
-    start = 0
-    while start < len(text):
-        chunk = text[start:start + max_chars]
-        chunks.append(chunk)
-        start += max_chars - overlap
-    
-    if start < len(text):
-        chunks.append(text[start:])
-
-    return chunks
-
-
 def embed_text(text):
     embeddings = embedding_client.embeddings(text)
     return embeddings
 
 
+def embed_chunks(chunks):
+    return [embed_text(chunk) for chunk in chunks]
+
+
 def calc_centroid(embeddings):
     return np.mean(embeddings, axis=0)
 
@@ -1506,7 +1559,9 @@ async def upload_meeting_file(request):
     file_contents = files[file_name]
     
     # Upload to Supabase Storage
-    storage_response = supabase.storage.from_("meeting_context_files").upload(
+    storage_response = await offload.run(
+        "storage",
+        supabase.storage.from_("meeting_context_files").upload,
         unique_filename,
         file_contents
     )
@@ -1515,35 +1570,25 @@ async def upload_meeting_file(request):
     file_url = supabase.storage.from_("meeting_context_files").get_public_url(unique_filename)
 
 
-    new_entry = supabase.table("meetings").upsert(
-        {
-            "meeting_id": meeting_id,
-            "user_id": user_id,
-            "context_files": [file_url]
-        },
-        on_conflict="meeting_id, user_id"
-    ).execute()
-
-    pdf_stream = BytesIO(file_contents)
-    reader = PdfReader(pdf_stream)
-
-    file_text = ''
-    for page in reader.pages:
-        file_text += page.extract_text()
+    new_entry = await db_async.upsert_meeting({
+        "meeting_id": meeting_id,
+        "user_id": user_id,
+        "context_files": [file_url]
+    })
 
-    file_chunks = get_chunks(file_text)
-    embedded_chunks = [str(embed_text(chunk)) for chunk in file_chunks]
+    # parsing holds the GIL for the whole document, so it runs in another process
+    file_chunks = await offload.run_cpu("pdf", pdf_chunks, file_contents)
+    embedded_chunks = [str(embedding) for embedding in await offload.run("embedding", embed_chunks, file_chunks)]
 
-    result = supabase.table("meetings")\
-        .update({"embeddings": embedded_chunks, "chunks": file_chunks})\
-        .eq("meeting_id", meeting_id)\
-        .eq("user_id", user_id)\
-        .execute()
+    updated_meeting = await db_async.update_meeting(
+        meeting_id, user_id, {"embeddings": embedded_chunks, "chunks": file_chunks}
+    )
+    await offload.run("vectors", bm25_indexes.put, (meeting_id, user_id), file_chunks)
     
     return {
         "status": "success",
         "file_url": file_url,
-        "updated_meeting": result.data[0]
+        "updated_meeting": updated_meeting
     }
 
 
@@ -1569,7 +1614,7 @@ class ActionItemsRequest(Body):
     meeting_summary: Optional[str] = None
 
 
-def create_memory_object(transcript):
+def create_memory_object(transcript, res=None):
     # Try to get from cache
     logger.info("Cache miss - generating new results")
 
@@ -1580,7 +1625,8 @@ def create_memory_object(transcript):
     #     action_items = extract_action_items(transcript)
     #     notes_content = generate_notes(transcript)
     # else:
-    res = generate_everything(transcript)
+    if res is None:
+        res = generate_everything(transcript)
     notes_content = res["notes"]
     action_items = res["action_items"]
     # action_items_list = summary["action_items_list"]
@@ -1597,7 +1643,8 @@ def create_memory_object(transcript):
     if isinstance(notes_content, list):
         notes_content = '\n'.join(notes_content)
     
-    title = generate_title(notes_content)
+    # the title comes back with the notes, only spend a round trip on it if it's missing
+    title = res.get("title") or generate_title(notes_content)
     
     result = {
         "action_items": action_items,
@@ -1607,23 +1654,28 @@ def create_memory_object(transcript):
     
     return result
 
-@lru_cache(maxsize=1000)
 def check_memory_enabled(user_id):
     try:
-        result = supabase.table("users").select("memory_enabled").eq("id", user_id).execute()
-        if result.data and len(result.data) > 0:
-            return result.data[0].get("memory_enabled", False)
+        profile = user_profiles.get(user_id)
+        if profile:
+            return profile.get("memory_enabled", False)
         logger.warning(f"No user found with id {user_id}")
         return False
     except Exception as e:
         logger.error(f"Error checking memory enabled for user {user_id}: {str(e)}")
         return False
 
+def discard_task(task: asyncio.Task):
+    """Cancel a task nobody will await, retrieving its error if it already failed"""
+    task.cancel()
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
 @app.post("/end_meeting")
 async def end_meeting(request: Request, body: EndMeetingRequest):
     # the logic here could be simplified as well
     # TODO: simplify the logic
-    if request.ip_addr == "41.182.69.223":
+    if client_ip(request) == "41.182.69.223":
         return {
             "action_items": "<h1>You</h1><p>be careful next time ;)</p>",
             "notes_content": "you are being watched"
@@ -1634,12 +1686,22 @@ async def end_meeting(request: Request, body: EndMeetingRequest):
     user_id = data.get("user_id", None)
     meeting_id = data.get("meeting_id", None)
 
+    # extension retries and double clicks attach to the first call or get its stored result
+    key = request_key(request.headers, {"transcript": transcript, "user_id": user_id, "meeting_id": meeting_id})
+    try:
+        return await idempotency.run(
+            f"end_meeting:{user_id}", key, lambda: finish_meeting(transcript, user_id, meeting_id)
+        )
+    except IdempotencyInProgress as e:
+        return in_progress_response(e)
 
+
+async def finish_meeting(transcript: str, user_id: str, meeting_id: str):
     if not user_id:
         # this is a temporary fix for the issue
         # we need to fix this in the future
         # TODO: figure out why tf are we not sending user_id from the chrome extension
-        res = generate_everything(transcript)
+        res = await offload.run("llm", generate_everything, transcript)
         notes_content = res["notes"]
         action_items = res["action_items"]
         return {
@@ -1650,7 +1712,7 @@ async def end_meeting(request: Request, body: EndMeetingRequest):
     if not meeting_id:
         # action_items = extract_action_items(transcript)
         # notes_content = generate_notes(transcript)
-        res = generate_everything(transcript)
+        res = await offload.run("llm", generate_everything, transcript)
         notes_content = res["notes"]
         action_items = res["action_items"]
         
@@ -1660,42 +1722,55 @@ async def end_meeting(request: Request, body: EndMeetingRequest):
         }
     
     
-    is_memory_enabled = check_memory_enabled(user_id)
+    # start generating speculatively while we look up the user and the meeting,
+    # most meetings end without a stored memory so the work is rarely wasted
+    generation = asyncio.create_task(offload.run("llm", generate_everything, transcript))
 
-    if not is_memory_enabled:
-        # notes_content = generate_notes(transcript)
-        # action_items = extract_action_items(transcript)
-        res = generate_everything(transcript)
-        notes_content = res["notes"]
-        action_items = res["action_items"]
-        return {
-            "notes_content": notes_content,
-            "action_items": action_items
-        }
+    # memories are embedded through the memories.meeting_id foreign key so the
+    # meeting row and its stored content come back in a single round trip
+    try:
+        is_memory_enabled, meeting_obj = await asyncio.gather(
+            offload.run("supabase", check_memory_enabled, user_id),
+            db_async.get_late_meeting(meeting_id, columns="id, transcript, memories(content)"),
+        )
 
+        if not is_memory_enabled:
+            res = await generation
+            notes_content = res["notes"]
+            action_items = res["action_items"]
+            return {
+                "notes_content": notes_content,
+                "action_items": action_items
+            }
 
-    meeting_obj = supabase.table("late_meeting").select("id, transcript").eq("meeting_id", meeting_id).execute().data
-    if not meeting_obj or len(meeting_obj) == 0 or meeting_obj[0]["transcript"] is None:
-        result = supabase.table("late_meeting").upsert({
+        memory = meeting_obj["memories"] if meeting_obj else []
+
+        if not meeting_obj or meeting_obj["transcript"] is None:
+            result = await db_async.upsert_late_meeting({
                 "meeting_id": meeting_id,
                 "user_ids": [user_id],
                 "meeting_start_time": time.time()
-            }, on_conflict="meeting_id").execute()
+            })
 
-        meeting_obj_id = result.data[0]["id"]
-        meeting_obj_transcript_exists = None
+            meeting_obj_id = result["id"]
+            meeting_obj_transcript_exists = None
 
-    else:
-        meeting_obj_id = meeting_obj[0]["id"]
-        meeting_obj_transcript_exists = meeting_obj[0]["transcript"]
+        else:
+            meeting_obj_id = meeting_obj["id"]
+            meeting_obj_transcript_exists = meeting_obj["transcript"]
+    except BaseException:
+        # nothing will await the generation once the request fails
+        discard_task(generation)
+        raise
 
     if not meeting_obj_transcript_exists:
         # Fire and forget transcript storage
-        asyncio.create_task(store_transcript_file(transcript, meeting_obj_id))
-
-    memory = supabase.table("memories").select("*").eq("meeting_id", meeting_obj_id).execute().data
+        submit_background("transcript_upload", store_transcript_file, transcript, meeting_obj_id)
 
     if memory and memory[0]["content"] and "ACTION_ITEMS" in memory[0]["content"]:
+        # the speculative generation is no longer needed, the provider call itself
+        # can't be interrupted but its result is dropped
+        discard_task(generation)
         summary = memory[0]["content"].split("DIVIDER")[0]
         action_items = memory[0]["content"].split("DIVIDER")[1]
         return {
@@ -1703,16 +1778,20 @@ async def end_meeting(request: Request, body: EndMeetingRequest):
             "notes_content": summary
         }
     else:
-        memory_obj = create_memory_object(transcript=transcript)
+        res = await generation
+        memory_obj = await offload.run("llm", create_memory_object, transcript, res)
         
         response = {
             "action_items": memory_obj["action_items"],
             "notes_content": memory_obj["notes_content"]
         }
 
-        # Create and start the storage task after preparing the response
-        pool = multiprocessing.pool.ThreadPool(processes=1)
-        pool.apply_async(store_memory_data, args=(memory_obj, user_id, meeting_obj_id, pool))
+        # Queue the storage task after preparing the response, waiting briefly for
+        # room in the queue so a backlog slows producers down instead of growing
+        await offload.run(
+            "background", submit_background, "memory_storage", store_memory_data, memory_obj, user_id, meeting_obj_id,
+            timeout=background_submit_timeout
+        )
 
         return response
 
@@ -1725,15 +1804,17 @@ async def generate_actions(request, body: ActionRequest):
     logger.info(f"Generating actions for transcript with cache key: {cache_key}")
     
     # Try to get from cache
-    cached_result = redis_client.get(cache_key)
+    cached_result = await offload.run("redis", redis_client.get, cache_key)
     if cached_result:
         logger.info("Retrieved result from cache")
         return json.loads(cached_result)
     
     logger.info("Cache miss - generating new results")
     # Generate new results if not in cache
-    action_items = extract_action_items(transcript)
-    notes_content = generate_notes(transcript)
+    action_items, notes_content = await asyncio.gather(
+        offload.run("llm", extract_action_items, transcript),
+        offload.run("llm", generate_notes, transcript),
+    )
     
     result = {
         "action_items": action_items,
@@ -1741,7 +1822,9 @@ async def generate_actions(request, body: ActionRequest):
     }
     
     # Cache the result
-    redis_client.setex(
+    await offload.run(
+        "redis",
+        redis_client.setex,
         cache_key,
         CACHE_EXPIRATION,
         json.dumps(result)
@@ -1758,7 +1841,7 @@ async def submit(request: Request, body: ActionItemsRequest):
     
     # notion_url = create_note(notes_content)
     emails = data["emails"]
-    successful_emails = send_email_summary(emails, action_items, meeting_summary)
+    successful_emails = await offload.run("email", send_email_summary, emails, action_items, meeting_summary)
 
     if successful_emails["type"] == "error":
         return {
@@ -1780,12 +1863,17 @@ async def track(request: Request, body: TrackingRequest):
         uuid = data["uuid"]
         event_type = data["event_type"]
         meeting_id = data.get("meeting_id")
-        result = supabase.table("analytics").insert({
+        # buffered and bulk inserted by the flusher, see workers/analytics.py
+        accepted = analytics_buffer.append({
             "uuid": uuid,
             "event_type": event_type,
             "meeting_id": meeting_id
-        }).execute()
-        return {"result": "success"}
+        })
+        return Response(
+            status_code=202,
+            description=json.dumps({"result": "accepted" if accepted else "dropped"}),
+            headers={"Content-Type": "application/json"}
+        )
     except Exception as e:
         return Response(
             status_code=500,
@@ -1797,7 +1885,7 @@ async def track(request: Request, body: TrackingRequest):
 @app.before_request()
 def before_request(request: Request):
     # WALL OF SHAME FOR THE IPS TRYING TO DOS US
-    if request.ip_addr == "41.182.69.223":
+    if client_ip(request) == "41.182.69.223":
         return {
             "action_items": "<h1>You</h1><p>be careful next time ;)</p>",
             "notes_content": "you are being watched"
@@ -1810,16 +1898,17 @@ def home():
     return "Welcome to the Amurex backend!"
 
 
-def find_closest_chunk(query_embedding, chunks_embeddings, chunks):
-    query_embedding = np.array(query_embedding)
-    chunks_embeddings = np.array(chunks_embeddings)
-
-    similarities = cosine_similarity([query_embedding], chunks_embeddings)
-
-    closest_indices = np.argsort(similarities, axis=1)[0, -5:][::-1] # Five the closest indices of embeddings
-    closest_chunks = [chunks[i] for i in closest_indices]
-
-    return closest_chunks
+def rank_closest_chunks(meeting_key, chunks, query_embedding, chunks_embeddings, top_k=20):
+    # embeddings come back from Supabase as "[x, y, ...]" strings, they are only
+    # parsed and quantized when the meeting's chunks change
+    # indices of the closest chunks, closest first
+    return vector_indexes.search(
+        meeting_key,
+        BM25Cache.fingerprint(chunks),
+        lambda: np.array([parse_array_string(item) for item in chunks_embeddings]),
+        query_embedding,
+        top_k,
+    )
 
 
 def generate_realtime_suggestion(context, transcript):
@@ -1849,9 +1938,8 @@ def generate_realtime_suggestion(context, transcript):
         }
     ]
 
-    response = ai_client.chat_completions_create(
-        # model="llama-3.2",
-        model="gpt-4o",
+    response = ai_client.task_completions_create(
+        task="suggest",
         messages=messages,
         temperature=0
     )
@@ -1859,7 +1947,7 @@ def generate_realtime_suggestion(context, transcript):
     return response
 
 
-def check_suggestion(request_dict): 
+async def check_suggestion(request_dict): 
     try:
         transcript = request_dict["transcript"]
         meeting_id = request_dict["meeting_id"]
@@ -1867,7 +1955,9 @@ def check_suggestion(request_dict):
         is_file_uploaded = request_dict.get("isFileUploaded", None)
 
         if is_file_uploaded:
-            sb_response = supabase.table("meetings").select("context_files, embeddings, chunks, suggestion_count").eq("meeting_id", meeting_id).eq("user_id", user_id).execute().data
+            sb_response = await db_async.get_meeting_context(
+                meeting_id, user_id, columns="context_files, embeddings, chunks, suggestion_count"
+            )
 
             if not sb_response:
                 return {
@@ -1876,8 +1966,7 @@ def check_suggestion(request_dict):
                     "last_question": None,
                     "type": "no_record_found"
                     }
-            
-            sb_response = sb_response[0]
+
             if not sb_response["context_files"] or not sb_response["chunks"]:
                 return {
                     "files_found": False,
@@ -1897,7 +1986,6 @@ def check_suggestion(request_dict):
             
             file_chunks = sb_response["chunks"]
             embedded_chunks = sb_response["embeddings"]
-            embedded_chunks = [parse_array_string(item) for item in embedded_chunks]
 
             messages_list = [
                 {
@@ -1926,22 +2014,61 @@ def check_suggestion(request_dict):
                 }
             ]
 
-            response = ai_client.chat_completions_create(
-                # model="llama-3.2",
-                model="gpt-4o",
-                messages=messages_list,
-                temperature=0,
-                response_format={"type": "json_object"}
-            )
+            # every blocking stage runs in a thread so a newer message can cancel this one in between
+            detection = question_detector.detect(transcript) if question_detector.mode != "off" else None
+            if detection is not None and question_detector.should_skip(detection):
+                response_content = {"needs_help": detection.probability >= 0.5, "last_question": detection.question}
+            else:
+                response = await offload.run(
+                    "llm",
+                    ai_client.task_completions_create,
+                    task="needs_help",
+                    messages=messages_list,
+                    temperature=0,
+                    response_format={"type": "json_object"}
+                )
+
+                response_content = json.loads(response)
+                if detection is not None:
+                    question_detector.record_llm(detection, response_content.get("needs_help"))
 
-            response_content = json.loads(response)
             last_question = response_content["last_question"]
 
             if 'needs_help' in response_content and response_content["needs_help"]:
-                embedded_query = embed_text(last_question)
-                closest_chunks = find_closest_chunk(query_embedding=embedded_query, chunks_embeddings=embedded_chunks, chunks=file_chunks)
-
-                suggestion = generate_realtime_suggestion(context=closest_chunks, transcript=transcript)
+                # exact names and numbers are matched lexically, the rest by embedding similarity
+                bm25 = await offload.run("vectors", bm25_indexes.get, (meeting_id, user_id), file_chunks)
+                lexical_ranking = [index for index, _ in bm25.search(last_question)]
+                try:
+                    embedded_query = await asyncio.wait_for(
+                        offload.run("embedding", suggestion_cache.embed, last_question, embed_text),
+                        timeout=embedding_timeout
+                    )
+                except Exception as e:
+                    # answer from the lexical ranking alone rather than waiting on the provider
+                    logger.warning(f"Embedding unavailable for meeting {meeting_id}, using lexical retrieval: {str(e) or type(e).__name__}")
+                    embedded_query = None
+
+                # keyed by the chunks so suggestions built from replaced files are never
+                # served, whichever worker handled the upload
+                suggestion_key = (meeting_id, user_id, BM25Cache.fingerprint(file_chunks))
+                suggestion = suggestion_cache.lookup(suggestion_key, embedded_query) if embedded_query is not None else None
+                if suggestion is None:
+                    ranking = lexical_ranking
+                    if embedded_query is not None:
+                        try:
+                            vector_ranking = await offload.run(
+                                "vectors", rank_closest_chunks,
+                                (meeting_id, user_id), file_chunks, query_embedding=embedded_query, chunks_embeddings=embedded_chunks
+                            )
+                            ranking = reciprocal_rank_fusion([vector_ranking, lexical_ranking])
+                        except Exception as e:
+                            logger.error(f"Vector retrieval failed for meeting {meeting_id}, using lexical retrieval: {str(e)}")
+                    # overlapping neighbours are merged into spans and near duplicates dropped
+                    context = "\n\n".join(context_packer.pack(file_chunks, ranking))
+
+                    suggestion = await offload.run("llm", generate_realtime_suggestion, context=context, transcript=transcript)
+                    if embedded_query is not None:
+                        suggestion_cache.store(suggestion_key, embedded_query, suggestion)
 
                 # result = supabase.table("meetings")\
                 #         .update({"suggestion_count": int(sb_response["suggestion_count"]) + 1})\
@@ -1984,31 +2111,25 @@ async def sync_meeting_with_supabase(meeting_id: str, user_id: str) -> str:
     """Sync meeting data with Supabase and return meeting object ID"""
     try:
         # First check if meeting exists in Supabase
-        meeting_obj = supabase.table("late_meeting")\
-            .select("id, user_ids")\
-            .eq("meeting_id", meeting_id)\
-            .execute().data
+        meeting_obj = await db_async.get_late_meeting(meeting_id, columns="id, user_ids")
 
         if not meeting_obj:
             # Create new meeting in Supabase
-            result = supabase.table("late_meeting").upsert({
+            result = await db_async.upsert_late_meeting({
                 "meeting_id": meeting_id,
                 "user_ids": [user_id],
                 "meeting_start_time": time.time()
-            }, on_conflict="meeting_id").execute()
+            })
             logger.info(f"Created new meeting in Supabase for meeting_id: {meeting_id}")
-            return result.data[0]["id"]
+            return result["id"]
         else:
             # Update existing meeting
-            existing_user_ids = meeting_obj[0]["user_ids"] or []
+            existing_user_ids = meeting_obj["user_ids"] or []
             if user_id not in existing_user_ids:
                 new_user_ids = list(set(existing_user_ids + [user_id]))
-                result = supabase.table("late_meeting")\
-                    .update({"user_ids": new_user_ids})\
-                    .eq("meeting_id", meeting_id)\
-                    .execute()
+                await db_async.update_late_meeting_users(meeting_id, new_user_ids)
                 logger.info(f"Added user {user_id} to existing meeting {meeting_id}")
-            return meeting_obj[0]["id"]
+            return meeting_obj["id"]
 
     except Exception as e:
         logger.error(f"Error in Supabase operation for meeting {meeting_id}: {str(e)}", exc_info=True)
@@ -2022,15 +2143,15 @@ async def on_connect(ws, msg):
 
     try:
         # Create meeting in SQLite if it doesn't exist
-        db.create_meeting(meeting_id)
+        await offload.run("meeting_state", db.create_meeting, meeting_id)
+        broadcaster.subscribe(meeting_id, ws)
         
         if user_id and user_id not in ("undefined", "null"):
             # Add connection to SQLite database
-            db.add_connection(ws.id, meeting_id, user_id)
+            await offload.run("meeting_state", db.add_connection, ws.id, meeting_id, user_id)
             
             # Set as primary user if none exists
-            if not db.get_primary_user(meeting_id):
-                db.set_primary_user(meeting_id, ws.id)
+            if await offload.run("meeting_state", db.claim_primary, meeting_id, ws.id) == ws.id:
                 logger.info(f"Set primary user for meeting {meeting_id}: {ws.id}")
 
             # Sync with Supabase
@@ -2066,18 +2187,20 @@ async def on_message(ws, msg):
 
         if type_ == "transcript_update":
             try:
-                # Check if this is the primary user
-                primary_user = db.get_primary_user(meeting_id)
+                # Check if this is the primary user, taking over if the primary left
+                primary_user = await offload.run("meeting_state", db.get_primary_user, meeting_id) \
+                    or await offload.run("meeting_state", db.claim_primary, meeting_id, ws.id)
                 if primary_user != ws.id or not data:
                     return ""
 
-                # Get current transcript and update
-                meeting = db.get_meeting(meeting_id)
-                current_transcript = meeting.get('transcript', '') if meeting else ''
-                updated_transcript = current_transcript + data
-                
-                # Update transcript in database
-                db.update_transcript(meeting_id, updated_transcript)
+                # Append to the transcript in place and push the delta to the other participants,
+                # one append per meeting at a time so updates keep their order off the event loop
+                lock = transcript_locks.get(meeting_id)
+                if lock is None:
+                    lock = transcript_locks[meeting_id] = asyncio.Lock()
+                async with lock:
+                    await offload.run("meeting_state", db.append_transcript, meeting_id, data)
+                broadcaster.publish(meeting_id, {"type": "transcript_delta", "meeting_id": meeting_id, "data": data}, exclude=ws.id)
                 logger.debug(f"Updated transcript for meeting {meeting_id}")
 
             except Exception as e:
@@ -2088,7 +2211,12 @@ async def on_message(ws, msg):
             data["meeting_id"] = meeting_id
             is_file_uploaded = data.get("isFileUploaded", None)
             if is_file_uploaded is True:
-                response = check_suggestion(data)
+                # remembered per socket so close discards the same key the socket scheduled under
+                suggestion_key = suggestion_keys[ws.id] = (meeting_id, data.get("user_id"))
+                response = await suggestion_scheduler.run(suggestion_key, check_suggestion, data)
+                if response is None:
+                    # superseded by a newer message or inside the cooldown
+                    return ""
                 return json.dumps(response)
             else:
                 return json.dumps({"files_found": False, "generated_suggestion": None, "last_question": None, "type": "no_file_uploaded"})
@@ -2109,7 +2237,11 @@ async def close(ws, msg):
         meeting_id = ws.query_params.get("meeting_id")
         
         # Remove connection from database
-        db.remove_connection(ws.id)
+        await offload.run("meeting_state", db.remove_connection, ws.id)
+        broadcaster.unsubscribe(meeting_id, ws.id)
+        suggestion_key = suggestion_keys.pop(ws.id, None)
+        if suggestion_key is not None:
+            suggestion_scheduler.discard(suggestion_key)
         logger.info(f"Closed connection for websocket {ws.id}")
         
     except Exception as e:
@@ -2124,19 +2256,31 @@ async def get_late_summary(path_params):
     if meeting_id == "undefined":
         return {"late_summary": ""}
 
-    meeting = db.get_meeting(meeting_id)
+    meeting = await offload.run("meeting_state", db.get_meeting, meeting_id)
     if not meeting or not meeting['transcript']:
         return {"late_summary": ""}
 
     # print("This is the late meeting transcript: ", meeting_id,  meeting['transcript'])
-    late_summary = generate_notes(meeting['transcript'])
+    late_summary = await offload.run("llm", generate_notes, meeting['transcript'])
+    if late_summary == "No notes found.":
+        return {"late_summary": late_summary}
+    broadcaster.publish(meeting_id, {"type": "summary_update", "meeting_id": meeting_id, "late_summary": late_summary})
     return {"late_summary": late_summary}
 
 
+@app.get("/transcript/:meeting_id")
+async def get_transcript(path_params):
+    # stored transcripts may be compressed, this serves them as text whatever the codec
+    meeting = await db_async.get_late_meeting(path_params["meeting_id"], columns="transcript")
+    if not meeting or not meeting.get("transcript"):
+        return {"transcript": ""}
+    return {"transcript": await offload.run("storage", read_transcript, meeting["transcript"])}
+
+
 @app.get("/check_meeting/:meeting_id")
 async def check_meeting(path_params):
     meeting_id = path_params["meeting_id"]
-    meeting = db.get_meeting(meeting_id)
+    meeting = await offload.run("meeting_state", db.get_meeting, meeting_id)
     return {"is_meeting": meeting is not None}
 
 
@@ -2147,13 +2291,16 @@ async def send_user_email(request):
     user_email = json.loads(request.body).get("email")
 
     if email_type == "signup":
-        response = send_email(user_email, email_type)
+        response = await offload.run("email", send_email, user_email, email_type)
         return response
     elif email_type == "meeting_share":
         share_url = json.loads(request.body).get("share_url")
         owner_email = json.loads(request.body).get("owner_email")
         meeting_obj_id = json.loads(request.body).get("meeting_id")
-        response = send_email(email=user_email, email_type=email_type, share_url=share_url, meeting_obj_id=meeting_obj_id, owner_email=owner_email)
+        response = await offload.run(
+            "email", send_email,
+            email=user_email, email_type=email_type, share_url=share_url, meeting_obj_id=meeting_obj_id, owner_email=owner_email
+        )
         return response
     else:
         logger.info('oh no')
@@ -2164,6 +2311,18 @@ async def send_user_email(request):
 @app.post("/update_meeting_obj")
 async def update_meeting_obj(request):
     json_body = json.loads(request.body)
+    meeting_obj_id = json_body.get("meeting_obj_id")
+    try:
+        return await idempotency.run(
+            f"update_meeting_obj:{meeting_obj_id}",
+            request_key(request.headers, json_body),
+            lambda: apply_meeting_update(json_body),
+        )
+    except IdempotencyInProgress as e:
+        return in_progress_response(e)
+
+
+async def apply_meeting_update(json_body: dict):
     transcript = json_body.get("transcript")
     meeting_obj_id = json_body.get("meeting_obj_id")
     summary = json_body.get("summary")
@@ -2172,34 +2331,35 @@ async def update_meeting_obj(request):
     supabase_update_object = {}
 
     if not action_items:
-        action_items = extract_action_items(transcript)
+        action_items = await offload.run("llm", extract_action_items, transcript)
         supabase_update_object["action_items"] = action_items
 
     if not summary:
-        summary = generate_notes(transcript)
+        summary = await offload.run("llm", generate_notes, transcript)
         supabase_update_object["summary"] = summary
 
     if transcript:
-        unique_filename = f"{uuid.uuid4()}.txt"
-        file_contents = transcript
-        file_bytes = file_contents.encode('utf-8')
-        
-        storage_response = supabase.storage.from_("transcripts").upload(
-            path=unique_filename,
-            file=file_bytes,
-        )
-        file_url = supabase.storage.from_("transcripts").get_public_url(unique_filename)
-        
+        file_url = await offload.run("storage", transcript_store.store, transcript)
         supabase_update_object["transcript"] = file_url
 
-    result = supabase.table("late_meeting")\
-                .update(supabase_update_object)\
-                .eq("id", meeting_obj_id)\
-                .execute()
+    await db_async.update_late_meeting(meeting_obj_id, supabase_update_object)
 
     return {"status": "ok"}
 
 
+@app.post("/invalidate_user/:user_id")
+async def invalidate_user(request):
+    # called by the backend after a user changes their settings so every worker reloads the profile
+    if not is_internal_request(request):
+        return Response(
+            status_code=401,
+            description=json.dumps({"error": "Unauthorized"}),
+            headers={"Content-Type": "application/json"}
+        )
+    await offload.run("supabase", user_profiles.invalidate, request.path_params["user_id"])
+    return {"status": "ok"}
+
+
 @app.get("/get_history")
 async def get_history(request):
 
@@ -2212,73 +2372,133 @@ async def health_check():
     return {"status": "ok"}
 
 
-async def store_transcript_file(transcript: str, meeting_obj_id: str):
-    """Store transcript file and update meeting record asynchronously"""
-    try:
-        unique_filename = f"{uuid.uuid4()}.txt"
-        file_bytes = transcript.encode('utf-8')
-        
-        storage_response = supabase.storage.from_("transcripts").upload(
-            path=unique_filename,
-            file=file_bytes,
-        )
-        file_url = supabase.storage.from_("transcripts").get_public_url(unique_filename)
-        
-        supabase.table("late_meeting")\
-            .update({"transcript": file_url})\
-            .eq("id", meeting_obj_id)\
-            .execute()
-    except Exception as e:
-        logger.error(f"Failed to store transcript: {str(e)}")
+@app.get("/stats")
+async def stats():
+    return {
+        "background": background.stats(),
+        "analytics": analytics_buffer.stats(),
+        "broadcast": broadcaster.stats(),
+        "question_detector": question_detector.stats(),
+        "suggestion_cache": suggestion_cache.stats(),
+        "bm25": bm25_indexes.stats(),
+        "vectors": vector_indexes.stats(),
+        "suggestions": suggestion_scheduler.stats(),
+        "offload": offload.stats(),
+        "idempotency": idempotency.stats(),
+        "llm": ai_client.router.snapshot(),
+        "hedging": ai_client.hedger.stats(),
+    }
 
-def store_memory_data(memory_obj: dict, user_id: str, meeting_obj_id: str, pool: multiprocessing.pool.ThreadPool):
-    """Store memory data asynchronously"""
-    try:
-        content = memory_obj["notes_content"] + memory_obj["action_items"]
-        content_chunks = get_chunks(content)
-        embeddings = [embed_text(chunk) for chunk in content_chunks]
-        # embeddings = []
-        centroid = str(calc_centroid(np.array(embeddings)).tolist())
-        # centroid = "[-0.1231232]"
-        embeddings = list(map(str, embeddings))
-        # embeddings = []
-        final_content = memory_obj["notes_content"] + f"\nDIVIDER\n" + memory_obj["action_items"]
-
-        supabase.table("memories").insert({
+
+def store_transcript_file(transcript: str, meeting_obj_id: str):
+    """Store transcript file and update meeting record in the background"""
+    file_url = transcript_store.store(transcript)
+    
+    supabase.table("late_meeting")\
+        .update({"transcript": file_url})\
+        .eq("id", meeting_obj_id)\
+        .execute()
+
+
+def store_memory_data(memory_obj: dict, user_id: str, meeting_obj_id: str):
+    """Embed the memory in the background and queue its write"""
+    content = memory_obj["notes_content"] + memory_obj["action_items"]
+    content_chunks = get_chunks(content)
+    embeddings = [embed_text(chunk) for chunk in content_chunks]
+    # embeddings = []
+    centroid = str(calc_centroid(np.array(embeddings)).tolist())
+    # centroid = "[-0.1231232]"
+    embeddings = list(map(str, embeddings))
+    # embeddings = []
+    final_content = memory_obj["notes_content"] + f"\nDIVIDER\n" + memory_obj["action_items"]
+
+    # the write is retried on its own so a lost response doesn't embed everything again
+    submit_background("memory_write", write_memory_data, {
+        "p_memory": {
             "user_id": user_id,
             "meeting_id": meeting_obj_id,
             "content": final_content,
             "chunks": content_chunks,
             "embeddings": embeddings,
             "centroid": centroid,
-        }).execute()
-
-        supabase.table("late_meeting")\
-            .update({
-                "summary": memory_obj["notes_content"], 
-                "action_items": memory_obj["action_items"], 
-                "meeting_title": memory_obj["title"]
-            })\
-            .eq("id", meeting_obj_id)\
-            .execute()
+        },
+        "p_summary": memory_obj["notes_content"],
+        "p_action_items": memory_obj["action_items"],
+        "p_title": memory_obj["title"],
+        # the same on every retry, so a retry after a lost response keeps the email claim
+        "p_claim_id": str(uuid.uuid4()),
+    }, meeting_obj_id)
+
+
+def write_memory_data(params: dict, meeting_obj_id: str):
+    """Write a prepared memory and send the post meeting email if this write claimed it"""
+    # one round trip: upsert the memory, update the meeting and claim the post
+    # meeting email atomically, see migrations/*_store_memory_function.sql
+    result = supabase.rpc("store_memory", params).execute().data
+
+    # send email with the summary after the meeting ends
+    if result["send_email"]:
+        submit_background(
+            "emails", send_post_meeting_email, result["email"], meeting_obj_id,
+            on_failure=lambda e: release_post_meeting_email(meeting_obj_id)
+        )
 
-        # send email with the summary after the meeting ends
-        user_email = supabase.table("users").select("email").eq("id", user_id).execute().data[0]["email"]
-        emails_enabled = supabase.table("users").select("emails_enabled").eq("id", user_id).execute().data[0]["emails_enabled"]
-        
-        email_already_sent = supabase.table("late_meeting").select("post_email_sent").eq("id", meeting_obj_id).execute().data[0]["post_email_sent"]
-        if not email_already_sent and emails_enabled:
-            send_email(email=user_email, email_type="post_meeting_summary", meeting_id=meeting_obj_id)
 
-            supabase.table("late_meeting").update({
-                "post_email_sent": True
-            }).eq("id", meeting_obj_id).execute()
+def send_post_meeting_email(user_email: str, meeting_obj_id: str):
+    """Send the post meeting summary, raising so the email gets retried"""
+    result = send_email(email=user_email, email_type="post_meeting_summary", meeting_id=meeting_obj_id)
+    if result["type"] == "error":
+        raise RuntimeError(result["error"])
 
-        pool.close()
-    except Exception as e:
-        logger.error(f"Failed to store memory data: {str(e)}")
 
+def release_post_meeting_email(meeting_obj_id: str):
+    """Give up the post meeting email claim after the email finally failed"""
+    supabase.table("late_meeting").update({
+        "post_email_sent": False,
+        "post_email_claim": None,
+    }).eq("id", meeting_obj_id).execute()
 
-if __name__ == "__main__":
+
+def submit_background(task_type: str, fn, *args, timeout: float = 0, on_failure=None, **kwargs):
+    try:
+        background.submit(task_type, fn, *args, timeout=timeout, on_failure=on_failure, **kwargs)
+    except BackgroundQueueFull as e:
+        logger.error(f"Dropping {task_type} task: {str(e)}")
+        if on_failure is not None:
+            on_failure(e)
+
+
+@app.startup_handler
+def start_warm_up():
+    # optional: import the SDKs of the providers named in WARMUP_PROVIDERS (e.g. "openai,groq,gemini,mistral")
+    # and build their clients on a background thread once the server is up
+    names = [name.strip() for name in os.getenv("WARMUP_PROVIDERS", "").split(",") if name.strip()]
+    if not names:
+        return
+
+    def warm_up():
+        time.sleep(float(os.getenv("WARMUP_DELAY", 1)))
+        # PDF parsing libraries aren't warmed here, they load in the offload processes, see workers/parsing.py
+        providers.warm_up(names)
+        logger.info(f"Warm-up finished, loaded providers: {providers.loaded()}")
+
+    threading.Thread(target=warm_up, name="provider-warm-up", daemon=True).start()
+
+
+@app.shutdown_handler
+async def on_shutdown():
+    analytics_buffer.stop()
+    background.shutdown(timeout=float(os.getenv("BACKGROUND_SHUTDOWN_TIMEOUT", 30)))
+    offload.shutdown()
+    await db_async.close()
+
+
+def main():
     port = int(os.getenv('PORT', 8080))
     app.start(port=port, host="0.0.0.0")
+
+
+if __name__ == "__main__":
+    # every offload pool process would import this file again, see server.py
+    logger.warning("Started from index.py, start the backend with server.py instead")
+    main()
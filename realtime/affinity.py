@@ -0,0 +1,343 @@
+"""
+Meeting-affinity routing in front of several Robyn instances.
+
+    AFFINITY_WORKERS=127.0.0.1:8081,127.0.0.1:8082 python -m realtime.affinity
+
+Each worker is a separate single-process `python server.py` listening on its own
+port. The proxy reads the request on every client connection, finds its
+meeting id and sends it to the worker that owns the meeting on a consistent
+hash ring, so per-meeting caches are only ever built on one worker. Plain
+HTTP connections are closed after one response so the next request, which
+may be for another meeting, is routed on its own; a websocket upgrade pins
+its connection to the owner for as long as it stays open. Workers are health checked on /health_check;
+when one leaves or comes back only the meetings it owns move.
+
+The meeting id is taken, in order, from the X-Meeting-Id header, a
+`meeting_id` query parameter, the path of the routes that carry it and a
+`meeting_id` field in a JSON body. Requests without one are spread round-robin.
+"""
+import asyncio
+import bisect
+import hashlib
+import itertools
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# routes with the meeting id as the first path parameter
+MEETING_PATH_PREFIXES = ("/late_summary/", "/check_meeting/", "/upload_meeting_file/")
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+PIPE_CHUNK_BYTES = 64 * 1024
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring with virtual nodes. Adding or removing a node only
+    moves the keys that land on that node's points.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 160):
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: Dict[int, str] = {}
+        self.nodes = set()
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str):
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for i in range(self.replicas):
+            point = _hash(f"{node}#{i}")
+            self._owners[point] = node
+            bisect.insort(self._points, point)
+
+    def remove(self, node: str):
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        for i in range(self.replicas):
+            point = _hash(f"{node}#{i}")
+            if self._owners.get(point) == node:
+                del self._owners[point]
+                self._points.pop(bisect.bisect_left(self._points, point))
+
+    def get(self, key: str) -> Optional[str]:
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+
+def meeting_id_from_request(head: bytes, body: bytes = b"") -> Optional[str]:
+    """Find the meeting id of a raw HTTP request, see the module docstring for the order."""
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        _, target, _ = lines[0].split(" ", 2)
+    except ValueError:
+        return None
+
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if headers.get("x-meeting-id"):
+        return headers["x-meeting-id"]
+
+    url = urlsplit(target)
+    meeting_id = parse_qs(url.query).get("meeting_id")
+    if meeting_id:
+        return meeting_id[0]
+
+    for prefix in MEETING_PATH_PREFIXES:
+        if url.path.startswith(prefix):
+            return url.path[len(prefix):].split("/", 1)[0] or None
+
+    if body and "json" in headers.get("content-type", ""):
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return None
+        if isinstance(data, dict) and data.get("meeting_id"):
+            return str(data["meeting_id"])
+    return None
+
+
+# hop-by-hop headers replaced when a connection is limited to one exchange
+_KEEP_ALIVE_HEADERS = (b"connection", b"keep-alive")
+
+
+def _is_upgrade(head: bytes) -> bool:
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"upgrade" and value.strip():
+            return True
+    return False
+
+
+def _rewrite_head(head: bytes, drop: Iterable[bytes], add: Iterable[bytes]) -> bytes:
+    """Replace the headers named in `drop` (lowercase) with the `add` lines."""
+    lines = head[:-4].split(b"\r\n")
+    kept = [line for line in lines[1:] if line.partition(b":")[0].strip().lower() not in drop]
+    return b"\r\n".join([lines[0], *kept, *add]) + b"\r\n\r\n"
+
+
+def _with_connection_close(head: bytes) -> bytes:
+    """Rewrite a request or response head so the connection closes after this exchange."""
+    return _rewrite_head(head, _KEEP_ALIVE_HEADERS, [b"Connection: close"])
+
+
+def _with_client_address(head: bytes, address: Optional[str]) -> bytes:
+    """
+    Tell the worker who the client is: X-Real-IP is replaced with the peer
+    address so clients can't set it, and the peer is appended to X-Forwarded-For.
+    """
+    if not address:
+        return head
+    forwarded = [
+        line.partition(b":")[2].strip() for line in head.split(b"\r\n")[1:]
+        if line.partition(b":")[0].strip().lower() == b"x-forwarded-for"
+    ]
+    chain = b", ".join([*forwarded, address.encode()])
+    return _rewrite_head(
+        head, (b"x-real-ip", b"x-forwarded-for"),
+        [b"X-Forwarded-For: " + chain, b"X-Real-IP: " + address.encode()],
+    )
+
+
+async def _relay_response(upstream_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter):
+    """Pipe one response to the client, telling it not to reuse the connection."""
+    try:
+        head = await upstream_reader.readuntil(b"\r\n\r\n")
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        client_writer.close()
+        return
+    client_writer.write(_with_connection_close(head))
+    await _pipe(upstream_reader, client_writer)
+
+
+async def _read_request_start(reader: asyncio.StreamReader) -> Tuple[bytes, bytes]:
+    """Read the request head and, when it is small and sized, the body."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    if len(head) > MAX_HEADER_BYTES:
+        raise ValueError("request head too large")
+    body = b""
+    for line in head.split(b"\r\n"):
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value.strip() or 0)
+            if 0 < length <= MAX_BODY_BYTES:
+                body = await reader.readexactly(length)
+            break
+    return head, body
+
+
+async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            chunk = await reader.read(PIPE_CHUNK_BYTES)
+            if not chunk:
+                break
+            writer.write(chunk)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        try:
+            writer.close()
+        except Exception:
+            pass
+
+
+class AffinityProxy:
+    """TCP proxy that sends each request, or websocket, to the worker owning its meeting."""
+
+    def __init__(
+        self,
+        workers: Iterable[str],
+        health_interval: float = 5.0,
+        health_timeout: float = 2.0,
+        failure_threshold: int = 2,
+        replicas: int = 160,
+    ):
+        self.workers = list(workers)
+        self.ring = HashRing(self.workers, replicas=replicas)
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.failure_threshold = failure_threshold
+        self._failures = {worker: 0 for worker in self.workers}
+        self._round_robin = itertools.cycle(self.workers)
+        self.routed = {worker: 0 for worker in self.workers}
+
+    def route(self, meeting_id: Optional[str]) -> Optional[str]:
+        if meeting_id:
+            return self.ring.get(meeting_id)
+        for _ in range(len(self.workers)):
+            worker = next(self._round_robin)
+            if worker in self.ring.nodes:
+                return worker
+        return None
+
+    def _mark(self, worker: str, healthy: bool):
+        if healthy:
+            self._failures[worker] = 0
+            if worker not in self.ring.nodes:
+                self.ring.add(worker)
+                logger.info(f"Worker {worker} joined the ring ({len(self.ring.nodes)} healthy)")
+            return
+        self._failures[worker] += 1
+        if self._failures[worker] >= self.failure_threshold and worker in self.ring.nodes:
+            self.ring.remove(worker)
+            logger.warning(f"Worker {worker} left the ring ({len(self.ring.nodes)} healthy)")
+
+    async def _check(self, worker: str) -> bool:
+        host, port = worker.rsplit(":", 1)
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(host, int(port)), self.health_timeout
+            )
+            writer.write(f"GET /health_check HTTP/1.1\r\nHost: {worker}\r\nConnection: close\r\n\r\n".encode())
+            await writer.drain()
+            status = await asyncio.wait_for(reader.readline(), self.health_timeout)
+            writer.close()
+            return b" 200 " in status
+        except Exception:
+            return False
+
+    async def health_loop(self):
+        while True:
+            results = await asyncio.gather(*(self._check(worker) for worker in self.workers))
+            for worker, healthy in zip(self.workers, results):
+                self._mark(worker, healthy)
+            await asyncio.sleep(self.health_interval)
+
+    async def handle(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter):
+        try:
+            head, body = await _read_request_start(client_reader)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, ConnectionError):
+            client_writer.close()
+            return
+
+        meeting_id = meeting_id_from_request(head, body)
+        # retry once on a fresh choice if the owner refuses the connection
+        for _ in range(2):
+            worker = self.route(meeting_id)
+            if worker is None:
+                break
+            host, port = worker.rsplit(":", 1)
+            try:
+                upstream_reader, upstream_writer = await asyncio.open_connection(
+                    host, int(port), limit=MAX_HEADER_BYTES
+                )
+                break
+            except OSError:
+                logger.warning(f"Worker {worker} refused a connection, removing it from the ring")
+                self._failures[worker] = self.failure_threshold
+                self.ring.remove(worker)
+        else:
+            worker = None
+
+        if worker is None:
+            client_writer.write(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await client_writer.drain()
+            client_writer.close()
+            return
+
+        self.routed[worker] += 1
+        peer = client_writer.get_extra_info("peername")
+        head = _with_client_address(head, peer[0] if peer else None)
+        if _is_upgrade(head):
+            # the websocket stays on the meeting's owner for its whole life
+            upstream_writer.write(head + body)
+            await upstream_writer.drain()
+            await asyncio.gather(
+                _pipe(client_reader, upstream_writer),
+                _pipe(upstream_reader, client_writer),
+            )
+            return
+
+        # one request per connection, a keep-alive connection would carry later
+        # requests for other meetings to this worker
+        upstream_writer.write(_with_connection_close(head) + body)
+        await upstream_writer.drain()
+        await asyncio.gather(
+            _pipe(client_reader, upstream_writer),
+            _relay_response(upstream_reader, client_writer),
+        )
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+        health = asyncio.create_task(self.health_loop())
+        logger.info(f"Affinity proxy listening on {host}:{port} for {', '.join(self.workers)}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            health.cancel()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    )
+    workers = [worker.strip() for worker in os.getenv("AFFINITY_WORKERS", "").split(",") if worker.strip()]
+    if not workers:
+        raise SystemExit("AFFINITY_WORKERS must list the workers as host:port,host:port")
+    proxy = AffinityProxy(
+        workers,
+        health_interval=float(os.getenv("AFFINITY_HEALTH_INTERVAL", 5)),
+        replicas=int(os.getenv("AFFINITY_REPLICAS", 160)),
+    )
+    asyncio.run(proxy.serve("0.0.0.0", int(os.getenv("PORT", 8080))))
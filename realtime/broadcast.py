@@ -0,0 +1,162 @@
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+from utils.process_local import OncePerProcess
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PATTERN = "meeting:*:events"
+
+
+def meeting_channel(meeting_id: str) -> str:
+    return f"meeting:{meeting_id}:events"
+
+
+class Subscriber:
+    """One connected socket with its own bounded send queue and sender task."""
+
+    def __init__(self, ws, queue_size: int):
+        self.ws = ws
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.task = asyncio.create_task(self._send_loop())
+
+    async def _send_loop(self):
+        while True:
+            message = await self.queue.get()
+            try:
+                await self.ws.async_send_to(self.ws.id, message)
+            except Exception as e:
+                logger.warning(f"Failed to push to websocket {self.ws.id}: {str(e)}")
+
+    def offer(self, message: str) -> bool:
+        """Queue `message`, returning whether an older pending one was dropped for it."""
+        # a slow client loses its oldest pending events, never stalls the others
+        dropped = self.queue.full()
+        if dropped:
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+        return dropped
+
+
+class MeetingBroadcaster:
+    """
+    Fan-out of meeting events to every socket connected to the meeting.
+
+    Sockets on this worker are delivered to directly. With a Redis client the
+    event is also published on `meeting:{id}:events`, and a subscriber thread
+    in every other worker delivers it to that worker's sockets; each event
+    carries the id of the worker that published it so it isn't delivered twice.
+    Publishing to Redis happens on a publisher thread, so `publish` never
+    blocks the event loop; events beyond `outbox_size` waiting for it are
+    dropped and counted.
+    """
+
+    def __init__(self, redis_client=None, queue_size: int = 100, outbox_size: int = 10000):
+        self.redis_client = redis_client
+        self.queue_size = queue_size
+        self._instance_id = uuid.uuid4().hex
+        self._subscribers: Dict[str, Dict[str, Subscriber]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # one subscriber thread per worker process, started on first subscribe
+        self._listener = OncePerProcess(self._start_listener)
+        self.outbox_size = outbox_size
+        self._outbox = None
+        self._publisher = OncePerProcess(self._start_publisher)
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    @property
+    def worker_id(self) -> str:
+        # the broadcaster is built before Robyn forks its workers, so the pid tells them apart
+        return f"{self._instance_id}:{os.getpid()}"
+
+    def subscribe(self, meeting_id: str, ws):
+        """Register `ws` for the meeting's events, must be called on the event loop."""
+        self._loop = asyncio.get_running_loop()
+        if self.redis_client is not None:
+            self._listener.ensure()
+        self._subscribers.setdefault(meeting_id, {})[ws.id] = Subscriber(ws, self.queue_size)
+
+    def unsubscribe(self, meeting_id: str, ws_id: str):
+        subscribers = self._subscribers.get(meeting_id)
+        if not subscribers:
+            return
+        subscriber = subscribers.pop(ws_id, None)
+        if subscriber:
+            subscriber.task.cancel()
+        if not subscribers:
+            self._subscribers.pop(meeting_id, None)
+
+    def publish(self, meeting_id: str, event: dict, exclude: Optional[str] = None):
+        """Push `event` to the meeting's sockets on every worker, except the socket `exclude`."""
+        self.published += 1
+        message = json.dumps(event)
+        self._deliver(meeting_id, message, exclude)
+        if self.redis_client is not None:
+            self._publisher.ensure()
+            payload = json.dumps({"origin": self.worker_id, "exclude": exclude, "message": message})
+            try:
+                self._outbox.put_nowait((meeting_id, payload))
+            except queue.Full:
+                self.dropped += 1
+                logger.warning(f"Broadcast outbox full, dropped an event for meeting {meeting_id}")
+
+    def _start_publisher(self):
+        self._outbox = queue.Queue(maxsize=self.outbox_size)
+        threading.Thread(target=self._publish_loop, name="meeting-broadcast-publisher", daemon=True).start()
+
+    def _publish_loop(self):
+        while True:
+            meeting_id, payload = self._outbox.get()
+            try:
+                self.redis_client.publish(meeting_channel(meeting_id), payload)
+            except Exception as e:
+                logger.error(f"Failed to publish event for meeting {meeting_id}: {str(e)}")
+
+    def _deliver(self, meeting_id: str, message: str, exclude: Optional[str] = None):
+        for ws_id, subscriber in list(self._subscribers.get(meeting_id, {}).items()):
+            if ws_id != exclude:
+                self.dropped += subscriber.offer(message)
+                self.delivered += 1
+
+    def stats(self) -> dict:
+        return {
+            "meetings": len(self._subscribers),
+            "sockets": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+    def _start_listener(self):
+        threading.Thread(target=self._listen, name="meeting-broadcast", daemon=True).start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(CHANNEL_PATTERN)
+                for message in pubsub.listen():
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    meeting_id = channel[len("meeting:"):-len(":events")]
+                    if meeting_id not in self._subscribers:
+                        continue
+                    payload = json.loads(message["data"])
+                    if payload["origin"] == self.worker_id:
+                        continue
+                    self._loop.call_soon_threadsafe(
+                        self._deliver, meeting_id, payload["message"], payload["exclude"]
+                    )
+            except Exception as e:
+                logger.error(f"Meeting broadcast listener failed, resubscribing: {str(e)}")
+                time.sleep(5)
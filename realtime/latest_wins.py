@@ -0,0 +1,88 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class LatestWinsScheduler:
+    """
+    At most one in-flight run per key; a newer run cancels the older one.
+
+    Each run first waits `debounce` seconds, so a burst of messages only does
+    the work once for the last of them. After a run whose result satisfies
+    `cooldown_when`, new runs for the key are dropped for `cooldown` seconds.
+    A cancelled or dropped run returns None to its caller.
+
+    Cancelling only stops awaiting: work already handed to a thread finishes
+    in the background and its result is discarded.
+    """
+
+    def __init__(
+        self,
+        debounce: float = 0.0,
+        cooldown: float = 0.0,
+        cooldown_when: Callable[[Any], bool] = bool,
+    ):
+        self.debounce = debounce
+        self.cooldown = cooldown
+        self.cooldown_when = cooldown_when
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._cooldown_until: Dict[Hashable, float] = {}
+        self.started = 0
+        self.completed = 0
+        self.superseded = 0
+        self.throttled = 0
+
+    async def run(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Optional[Any]:
+        cooldown_until = self._cooldown_until.get(key)
+        if cooldown_until is not None:
+            if time.monotonic() < cooldown_until:
+                self.throttled += 1
+                return None
+            del self._cooldown_until[key]
+
+        if self._cancel(key):
+            self.superseded += 1
+        self.started += 1
+        task = asyncio.create_task(self._run(key, fn, *args, **kwargs))
+        self._tasks[key] = task
+        try:
+            # shielded so a newer run cancelling the task is told apart from our caller being cancelled
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if task.cancelled():
+                return None
+            task.cancel()
+            raise
+        finally:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+
+    async def _run(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        if self.debounce:
+            await asyncio.sleep(self.debounce)
+        result = await fn(*args, **kwargs)
+        self.completed += 1
+        if self.cooldown and self.cooldown_when(result):
+            self._cooldown_until[key] = time.monotonic() + self.cooldown
+        return result
+
+    def _cancel(self, key: Hashable) -> bool:
+        task = self._tasks.pop(key, None)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    def discard(self, key: Hashable):
+        """Cancel the key's in-flight run and forget its cooldown, e.g. when its socket closes."""
+        self._cancel(key)
+        self._cooldown_until.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._tasks),
+            "started": self.started,
+            "completed": self.completed,
+            "superseded": self.superseded,
+            "throttled": self.throttled,
+        }
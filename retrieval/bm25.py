@@ -0,0 +1,110 @@
+import hashlib
+import math
+import re
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from typing import Dict, Hashable, Iterable, List, Sequence, Tuple
+
+# keeps numbers and names like "q3", "1.5" or "o'brien" as one token
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.'][a-z0-9]+)*")
+
+STOPWORDS = frozenset((
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "can", "could", "did", "do",
+    "does", "for", "from", "had", "has", "have", "how", "i", "in", "is", "it", "its", "me",
+    "my", "of", "on", "or", "our", "so", "that", "the", "their", "there", "they", "this",
+    "to", "us", "was", "we", "were", "what", "when", "where", "which", "who", "why", "will",
+    "with", "would", "you", "your",
+))
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """Okapi BM25 over a list of text chunks, results are chunk indices."""
+
+    def __init__(self, chunks: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.size = len(chunks)
+        self._postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._lengths = []
+        for index, chunk in enumerate(chunks):
+            terms = tokenize(chunk)
+            self._lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                self._postings[term].append((index, frequency))
+        self._average_length = sum(self._lengths) / self.size if self.size else 0.0
+
+    def idf(self, term: str) -> float:
+        documents = len(self._postings.get(term, ()))
+        return math.log(1 + (self.size - documents + 0.5) / (documents + 0.5))
+
+    def search(self, query: str, top_k: int = 20) -> List[Tuple[int, float]]:
+        """Best `top_k` chunks for `query` as (chunk index, score), highest first."""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)) - STOPWORDS:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for index, frequency in postings:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[index] / self._average_length)
+                scores[index] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return sorted(scores.items(), key=lambda item: -item[1])[:top_k]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[int]], k: int = 60) -> List[int]:
+    """Merge several rankings of chunk indices, each contributing 1 / (k + rank)."""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, index in enumerate(ranking, start=1):
+            scores[index] += 1 / (k + rank)
+    return sorted(scores, key=lambda index: -scores[index])
+
+
+class BM25Cache:
+    """
+    Per-process LRU of BM25 indexes keyed by (meeting, user).
+
+    Indexes are built when a file is uploaded, or on first search in a worker
+    that didn't see the upload. A fingerprint of the chunks rebuilds an index
+    whose chunks have changed since.
+    """
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    @staticmethod
+    def fingerprint(chunks: Sequence[str]) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        for chunk in chunks:
+            digest.update(chunk.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def put(self, key: Hashable, chunks: Sequence[str]) -> BM25Index:
+        index = BM25Index(chunks)
+        with self._lock:
+            self.builds += 1
+            self._entries[key] = (self.fingerprint(chunks), index)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
+
+    def get(self, key: Hashable, chunks: Sequence[str]) -> BM25Index:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry[0] == self.fingerprint(chunks):
+            with self._lock:
+                self._entries.move_to_end(key)
+            return entry[1]
+        return self.put(key, chunks)
+
+    def stats(self) -> dict:
+        return {"indexes": len(self._entries), "builds": self.builds}
@@ -0,0 +1,86 @@
+from typing import Dict, List, Optional, Sequence
+
+from retrieval.bm25 import STOPWORDS, tokenize
+
+
+def estimate_text_tokens(text: str) -> int:
+    # same ~4 characters per token rule as ai.router.estimate_tokens
+    return len(text) // 4
+
+
+def _similarity(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ContextPacker:
+    """
+    Turns a ranking of overlapping chunks into a short prompt context.
+
+    Chunks come from workers.parsing.get_chunks, so chunk i+1 starts with the
+    last `overlap` characters of chunk i.
+    Candidates are picked by maximal marginal relevance: rank relevance minus
+    word overlap with what was already picked, weighted by `diversity`.
+    Picked neighbours are joined back into one contiguous span with the
+    repeated characters dropped, and picking stops once the spans would
+    exceed `token_budget`.
+    """
+
+    def __init__(self, token_budget: int = 300, diversity: float = 0.3, max_candidates: int = 20, overlap: int = 50):
+        self.token_budget = token_budget
+        self.diversity = diversity
+        self.max_candidates = max_candidates
+        self.overlap = overlap
+
+    def pack(self, chunks: Sequence[str], ranking: Sequence[int]) -> List[str]:
+        """Spans of `chunks` for the indices in `ranking` (best first), most relevant span first."""
+        candidates = list(dict.fromkeys(ranking))[:self.max_candidates]
+        if not candidates:
+            return []
+        relevance = {index: 1 - rank / len(candidates) for rank, index in enumerate(candidates)}
+        words = {index: frozenset(tokenize(chunks[index])) - STOPWORDS for index in candidates}
+
+        selected: List[int] = []
+        remaining = list(candidates)
+        while remaining:
+            best, best_score = None, None
+            for index in remaining:
+                # a neighbour of a picked chunk extends its span rather than repeating it
+                redundancy = max(
+                    (_similarity(words[index], words[other]) for other in selected if abs(other - index) > 1),
+                    default=0.0,
+                )
+                score = (1 - self.diversity) * relevance[index] - self.diversity * redundancy
+                if best_score is None or score > best_score:
+                    best, best_score = index, score
+            remaining.remove(best)
+            if self._tokens(chunks, selected + [best]) <= self.token_budget or not selected:
+                selected.append(best)
+
+        return self._spans(chunks, selected, relevance)
+
+    def _tokens(self, chunks: Sequence[str], indices: List[int]) -> int:
+        return sum(estimate_text_tokens(span) for span in self._spans(chunks, indices))
+
+    def _spans(self, chunks: Sequence[str], indices: List[int], relevance: Optional[Dict[int, float]] = None) -> List[str]:
+        groups: List[List[int]] = []
+        for index in sorted(indices):
+            if groups and index == groups[-1][-1] + 1:
+                groups[-1].append(index)
+            else:
+                groups.append([index])
+        if relevance is not None:
+            groups.sort(key=lambda group: -max(relevance[index] for index in group))
+
+        spans = []
+        for group in groups:
+            text = chunks[group[0]]
+            for index in group[1:]:
+                chunk = chunks[index]
+                if text.endswith(chunk[:self.overlap]):
+                    text += chunk[self.overlap:]
+                else:
+                    text += " " + chunk
+            spans.append(text)
+        return spans
@@ -0,0 +1,144 @@
+import hashlib
+import io
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PROJECTIONS_TABLE = "embedding_projections"
+PROJECTIONS_BUCKET = "embedding_projections"
+
+
+@dataclass
+class Projection:
+    """
+    Linear map from provider embeddings down to `output_dim` dimensions.
+
+    "pca" is fitted on stored embeddings and keeps the directions with the
+    most variance. "truncate" keeps the leading dimensions as they are, which
+    only suits Matryoshka-trained models that front-load information.
+    """
+
+    version: str
+    method: str
+    mean: np.ndarray
+    components: np.ndarray
+    explained_variance: Optional[float] = None
+
+    @property
+    def input_dim(self) -> int:
+        return self.components.shape[1]
+
+    @property
+    def output_dim(self) -> int:
+        return self.components.shape[0]
+
+    def apply(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.method == "truncate":
+            return vectors[..., :self.output_dim]
+        return (vectors - self.mean) @ self.components.T
+
+    @classmethod
+    def fit_pca(cls, vectors: np.ndarray, dims: int) -> "Projection":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        mean = vectors.mean(axis=0)
+        _, singular_values, components = np.linalg.svd(vectors - mean, full_matrices=False)
+        variance = singular_values ** 2
+        explained = float(variance[:dims].sum() / variance.sum())
+        return cls._versioned("pca", mean, components[:dims].astype(np.float32), explained)
+
+    @classmethod
+    def truncate(cls, input_dim: int, dims: int) -> "Projection":
+        components = np.eye(dims, input_dim, dtype=np.float32)
+        return cls._versioned("truncate", np.zeros(input_dim, dtype=np.float32), components, None)
+
+    @classmethod
+    def _versioned(cls, method, mean, components, explained) -> "Projection":
+        digest = hashlib.sha256(mean.tobytes() + components.tobytes()).hexdigest()[:12]
+        version = f"{method}-{components.shape[1]}-{components.shape[0]}-{digest}"
+        return cls(version=version, method=method, mean=mean, components=components, explained_variance=explained)
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        metadata = {"version": self.version, "method": self.method, "explained_variance": self.explained_variance}
+        np.savez(buffer, mean=self.mean, components=self.components, metadata=np.array(json.dumps(metadata)))
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Projection":
+        with np.load(io.BytesIO(data)) as archive:
+            metadata = json.loads(str(archive["metadata"]))
+            return cls(mean=archive["mean"], components=archive["components"], **metadata)
+
+
+class ProjectionStore:
+    """
+    Versioned projections saved to the embedding_projections table and
+    bucket. `active` returns the projection marked active, re-checked at most
+    every `ttl` seconds, or None when there is none or it can't be loaded.
+    """
+
+    def __init__(self, supabase, ttl: float = 300):
+        self.supabase = supabase
+        self.ttl = ttl
+        self._active = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def active(self) -> Optional[Projection]:
+        with self._lock:
+            if self._checked_at is not None and time.monotonic() - self._checked_at < self.ttl:
+                return self._active
+            # other callers keep the current projection while this one refreshes it
+            self._checked_at = time.monotonic()
+            current = self._active
+
+        # fetched outside the lock so a slow Supabase call doesn't stall every search
+        try:
+            rows = self.supabase.table(PROJECTIONS_TABLE)\
+                .select("version, storage_path")\
+                .eq("active", True)\
+                .limit(1)\
+                .execute().data
+            if not rows:
+                loaded = None
+            elif current is None or current.version != rows[0]["version"]:
+                data = self.supabase.storage.from_(PROJECTIONS_BUCKET).download(rows[0]["storage_path"])
+                loaded = Projection.from_bytes(data)
+                logger.info(f"Loaded embedding projection {loaded.version}")
+            else:
+                loaded = current
+        except Exception as e:
+            logger.error(f"Failed to load the active embedding projection: {str(e)}")
+            return current
+
+        with self._lock:
+            self._active = loaded
+            return loaded
+
+    def save(self, projection: Projection, activate: bool = False):
+        storage_path = f"{projection.version}.npz"
+        self.supabase.storage.from_(PROJECTIONS_BUCKET).upload(storage_path, projection.to_bytes())
+        self.supabase.table(PROJECTIONS_TABLE).insert({
+            "version": projection.version,
+            "method": projection.method,
+            "input_dim": projection.input_dim,
+            "output_dim": projection.output_dim,
+            "explained_variance": projection.explained_variance,
+            "storage_path": storage_path,
+        }).execute()
+        if activate:
+            self.activate(projection.version)
+
+    def activate(self, version: str):
+        self.supabase.table(PROJECTIONS_TABLE).update({"active": False}).eq("active", True).execute()
+        self.supabase.table(PROJECTIONS_TABLE).update({"active": True}).eq("version", version).execute()
+        with self._lock:
+            self._checked_at = None
@@ -0,0 +1,242 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# first-pass candidates per requested result before exact rescoring
+OVERSAMPLING = {"float32": 1, "int8": 4, "binary": 10}
+# the reduced vectors of a projection lose more than int8 does
+PROJECTED_OVERSAMPLING = 4
+
+# rows scored per block, small enough for the int8 -> float32 copy to stay in cache
+BLOCK_ROWS = 256
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+class InMemoryVectors:
+    """Full-precision rows kept in process memory."""
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+
+    def fetch(self, indices: List[int]) -> np.ndarray:
+        return self.vectors[indices]
+
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes
+
+
+class MissingVectors(KeyError):
+    """The full-precision rows of an index expired or were evicted."""
+
+
+class RedisVectors:
+    """
+    Full-precision rows kept in a Redis hash, only the candidates are fetched
+    to rescore. Every fetch pushes the expiry back, so the hash outlives the
+    index using it unless Redis evicts it.
+    """
+
+    def __init__(self, redis_client, key: str, vectors: np.ndarray, ttl: int = 60 * 60 * 24):
+        self.redis = redis_client
+        self.key = key
+        self.ttl = ttl
+        self.dim = vectors.shape[1]
+        pipe = self.redis.pipeline()
+        pipe.delete(key)
+        for start in range(0, len(vectors), 1000):
+            pipe.hset(key, mapping={str(i): vectors[i].tobytes() for i in range(start, min(start + 1000, len(vectors)))})
+        pipe.expire(key, ttl)
+        pipe.execute()
+
+    def fetch(self, indices: List[int]) -> np.ndarray:
+        pipe = self.redis.pipeline()
+        pipe.hmget(self.key, [str(i) for i in indices])
+        pipe.expire(self.key, self.ttl)
+        rows, _ = pipe.execute()
+        if any(row is None for row in rows):
+            raise MissingVectors(f"{self.key} is missing rows")
+        return np.frombuffer(b"".join(rows), dtype=np.float32).reshape(len(indices), self.dim)
+
+    @property
+    def nbytes(self) -> int:
+        return 0
+
+
+class QuantizedIndex:
+    """
+    Cosine search over quantized vectors with exact rescoring.
+
+    "int8" stores each dimension as a byte scaled to that dimension's range
+    over the corpus (4x smaller than float32). "binary" stores only the sign
+    of each dimension, packed 8 to a byte (32x smaller), and ranks by Hamming
+    distance. Either pass returns top_k * oversampling candidates, which are
+    rescored exactly against their float32 rows. "float32" searches the full
+    vectors directly.
+
+    With a projection (see retrieval/projection.py) the first pass runs on the
+    reduced vectors, as float32 or int8, and the full vectors only rescore.
+
+    int8 saves memory, not time: numpy has no int8 matmul, so each block is
+    converted back to float32 and the pass ends up slower than a plain float32
+    scan (see benchmarks/quantization_bench.py). It pays off when the first-pass
+    codes have to stay small, e.g. with the float32 rows kept in Redis
+    (RedisVectors) for large corpora or many cached indexes per worker. For
+    speed use float32, or binary with rescoring.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        mode: str = "float32",
+        full_factory: Optional[Callable[[np.ndarray], object]] = None,
+        oversampling: Optional[int] = None,
+        projection=None,
+    ):
+        if mode not in OVERSAMPLING:
+            raise ValueError(f"Unknown quantization mode {mode}")
+        vectors = normalize(vectors)
+        self.mode = mode
+        self.projection = projection
+        self.size = len(vectors)
+        self.rescore = mode != "float32" or projection is not None
+        self.oversampling = oversampling or max(OVERSAMPLING[mode], PROJECTED_OVERSAMPLING if projection else 1)
+        # a float32 pass over the full vectors scans every row, so they have to be in memory
+        if full_factory is None or not self.rescore:
+            self.full = InMemoryVectors(vectors)
+        else:
+            self.full = full_factory(vectors)
+
+        first = normalize(projection.apply(vectors)) if projection is not None else vectors
+        self.dim = first.shape[1]
+        if mode == "int8":
+            low = first.min(axis=0)
+            scale = (first.max(axis=0) - low) / 255
+            scale[scale == 0] = 1
+            self.low, self.scale = low, scale
+            self.codes = (np.round((first - low) / scale) - 128).astype(np.int8)
+        elif mode == "binary":
+            self.codes = np.packbits(first > 0, axis=1)
+        elif projection is not None:
+            self.codes = first
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held in process for first-pass search and rescoring."""
+        codes = self.codes.nbytes if self.rescore else 0
+        return codes + self.full.nbytes
+
+    def _first_pass(self, query: np.ndarray) -> np.ndarray:
+        if self.projection is not None:
+            query = normalize(self.projection.apply(query))
+        if self.mode == "int8":
+            # x ~ (code + 128) * scale + low, so x.q = code.(scale * q) + const
+            weights = (self.scale * query).astype(np.float32)
+            constant = 128 * weights.sum() + float(self.low @ query)
+            scores = np.empty(self.size, dtype=np.float32)
+            buffer = np.empty((min(BLOCK_ROWS, self.size), self.dim), dtype=np.float32)
+            for start in range(0, self.size, BLOCK_ROWS):
+                block = self.codes[start:start + BLOCK_ROWS]
+                converted = buffer[:len(block)]
+                np.copyto(converted, block)
+                np.matmul(converted, weights, out=scores[start:start + len(block)])
+            return scores + constant
+        if self.mode == "binary":
+            query_bits = np.packbits(query > 0)
+            distances = np.bitwise_count(np.bitwise_xor(self.codes, query_bits)).sum(axis=1, dtype=np.int32)
+            return (self.dim - 2 * distances).astype(np.float32)
+        if self.projection is not None:
+            return self.codes @ query
+        return self.full.vectors @ query
+
+    def search(self, query, top_k: int = 20) -> List[int]:
+        """Indices of the `top_k` closest vectors to `query`, closest first."""
+        query = normalize(query)
+        top_k = min(top_k, self.size)
+        scores = self._first_pass(query)
+        if not self.rescore:
+            candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+            return candidates[np.argsort(-scores[candidates])].tolist()
+
+        n_candidates = min(self.size, top_k * self.oversampling)
+        candidates = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+        candidates = np.sort(candidates)
+        exact = self.full.fetch(candidates.tolist()) @ query
+        order = np.argsort(-exact)[:top_k]
+        return candidates[order].tolist()
+
+
+class QuantizedIndexCache:
+    """
+    Per-process LRU of QuantizedIndex keyed by (meeting, user), rebuilt when
+    the fingerprint of the underlying chunks or the active projection changes.
+    """
+
+    def __init__(self, mode: str = "float32", max_entries: int = 1000, full_factory=None, projections=None):
+        self.mode = mode
+        self.max_entries = max_entries
+        self.full_factory = full_factory
+        self.projections = projections
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def get(self, key: Hashable, fingerprint: str, load: Callable[[], np.ndarray]) -> QuantizedIndex:
+        # sign bits of PCA components are mostly noise past the first few, so
+        # binary codes are always taken from the full vectors
+        projection = self.projections.active() if self.projections is not None and self.mode != "binary" else None
+        version = (fingerprint, projection.version if projection else None)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        vectors = load()
+        if projection is not None and projection.input_dim != vectors.shape[1]:
+            logger.warning(f"Projection {projection.version} expects {projection.input_dim} dimensions, got {vectors.shape[1]}")
+            projection = None
+        full_factory = (lambda vectors: self.full_factory(key, fingerprint, vectors)) if self.full_factory else None
+        index = QuantizedIndex(vectors, mode=self.mode, full_factory=full_factory, projection=projection)
+        with self._lock:
+            self.builds += 1
+            self._entries[key] = (version, index)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
+
+    def search(self, key: Hashable, fingerprint: str, load: Callable[[], np.ndarray], query, top_k: int = 20) -> List[int]:
+        """Search the index of `key`, rebuilding it once if its stored rows are gone."""
+        try:
+            return self.get(key, fingerprint, load).search(query, top_k)
+        except MissingVectors as e:
+            logger.warning(f"Rebuilding the index of {key}: {str(e)}")
+            self.invalidate(key)
+            return self.get(key, fingerprint, load).search(query, top_k)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            indexes = [entry[1] for entry in self._entries.values()]
+        return {
+            "mode": self.mode,
+            "projection": next((index.projection.version for index in indexes if index.projection), None),
+            "indexes": len(indexes),
+            "builds": self.builds,
+            "bytes": sum(index.nbytes for index in indexes),
+        }
@@ -0,0 +1,103 @@
+"""
+Fits a dimensionality-reducing projection on the stored memory embeddings and
+saves it as a new version.
+
+    python scripts/fit_projection.py --dims 256 [--method pca|truncate] [--sample 20000] [--activate] [--backfill]
+
+PCA is fitted on a sample of chunk embeddings and centroids from `memories`;
+"truncate" only suits Matryoshka-trained embedding models. The projection is
+uploaded to the embedding_projections bucket and recorded in the table of the
+same name. --activate makes it the one the backend uses for first-stage
+search, --backfill writes `centroid_reduced` and `projection_version` for
+every memory.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+from dotenv import load_dotenv
+from supabase import create_client
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from retrieval.projection import Projection, ProjectionStore  # noqa: E402
+
+PAGE_SIZE = 500
+
+
+def parse_vector(value):
+    if isinstance(value, str):
+        return np.fromstring(value.strip()[1:-1], sep=",", dtype=np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+
+def iter_memories(supabase, columns):
+    start = 0
+    while True:
+        rows = supabase.table("memories")\
+            .select(columns)\
+            .order("id")\
+            .range(start, start + PAGE_SIZE - 1)\
+            .execute().data
+        yield from rows
+        if len(rows) < PAGE_SIZE:
+            return
+        start += PAGE_SIZE
+
+
+def sample_vectors(supabase, limit, rng):
+    vectors = []
+    for row in iter_memories(supabase, "centroid, embeddings"):
+        if row.get("centroid"):
+            vectors.append(parse_vector(row["centroid"]))
+        embeddings = row.get("embeddings") or []
+        if isinstance(embeddings, str):
+            embeddings = [embeddings]
+        vectors.extend(parse_vector(embedding) for embedding in embeddings)
+    vectors = [vector for vector in vectors if vector.size]
+    if len(vectors) > limit:
+        vectors = [vectors[i] for i in rng.choice(len(vectors), size=limit, replace=False)]
+    return np.stack(vectors)
+
+
+def backfill(supabase, projection):
+    updated = 0
+    for row in iter_memories(supabase, "id, centroid"):
+        if not row.get("centroid"):
+            continue
+        reduced = projection.apply(parse_vector(row["centroid"]))
+        supabase.table("memories").update({
+            "centroid_reduced": str(reduced.tolist()),
+            "projection_version": projection.version,
+        }).eq("id", row["id"]).execute()
+        updated += 1
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dims", type=int, required=True)
+    parser.add_argument("--method", choices=("pca", "truncate"), default="pca")
+    parser.add_argument("--sample", type=int, default=20000)
+    parser.add_argument("--activate", action="store_true")
+    parser.add_argument("--backfill", action="store_true")
+    args = parser.parse_args()
+
+    load_dotenv()
+    supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_ROLE_KEY"))
+    rng = np.random.default_rng(0)
+
+    vectors = sample_vectors(supabase, args.sample, rng)
+    print(f"sampled {len(vectors)} vectors of {vectors.shape[1]} dimensions")
+    if args.method == "pca":
+        projection = Projection.fit_pca(vectors, args.dims)
+        print(f"explained variance at {args.dims} dimensions: {projection.explained_variance:.3f}")
+    else:
+        projection = Projection.truncate(vectors.shape[1], args.dims)
+
+    ProjectionStore(supabase).save(projection, activate=args.activate)
+    print(f"saved projection {projection.version}{' (active)' if args.activate else ''}")
+
+    if args.backfill:
+        print(f"backfilled {backfill(supabase, projection)} memories")
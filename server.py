@@ -0,0 +1,15 @@
+"""
+Starts the backend.
+
+    python server.py [--processes 2] [--log-level WARN]
+
+index.py builds the app and its clients and caches when it is imported.
+multiprocessing re-imports the main script in every process of the offload
+pool (workers/offload.py), so the app is started from this script, which does
+nothing unless it is the one being run, instead of from index.py itself.
+"""
+
+if __name__ == "__main__":
+    from index import main
+
+    main()
@@ -0,0 +1,92 @@
+-- Columns the backend already relies on
+alter table late_meeting add column if not exists post_email_sent boolean default false;
+alter table late_meeting add column if not exists post_email_claim uuid;
+alter table users add column if not exists emails_enabled boolean default true;
+
+-- One memory per user and meeting, so a retried store_memory overwrites the
+-- row instead of adding another. Older duplicates written before this are
+-- moved to memories_archive rather than deleted, review them there.
+create table if not exists memories_archive (
+    like memories including all,
+    archived_at timestamp with time zone default now()
+);
+
+with ranked as (
+    select id, row_number() over (
+        partition by meeting_id, user_id order by created_at desc, id desc
+    ) as position
+    from memories
+    where meeting_id is not null and user_id is not null
+),
+archived as (
+    insert into memories_archive (id, created_at, user_id, content, chunks, embeddings, meeting_id, centroid)
+    select m.id, m.created_at, m.user_id, m.content, m.chunks, m.embeddings, m.meeting_id, m.centroid
+    from memories m
+    join ranked r on r.id = m.id
+    where r.position > 1
+    on conflict (id) do nothing
+    returning id
+)
+delete from memories where id in (select id from archived);
+
+create unique index if not exists memories_meeting_id_user_id_key
+    on memories (meeting_id, user_id);
+
+-- Stores a meeting memory, updates the meeting and claims the post meeting
+-- email in one transaction. Returns the address to send the summary to when
+-- this call won the claim, so concurrent workers never both send it.
+-- p_claim_id stays the same across retries of one write, so a retry whose
+-- first attempt committed but lost its response still gets the claim back.
+create or replace function store_memory(
+    p_memory jsonb,
+    p_summary text,
+    p_action_items text,
+    p_title text,
+    p_claim_id uuid default null
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_user_id uuid := (p_memory->>'user_id')::uuid;
+    v_meeting_id uuid := (p_memory->>'meeting_id')::uuid;
+    v_email text;
+    v_claimed boolean;
+begin
+    insert into memories (user_id, meeting_id, content, chunks, embeddings, centroid)
+    select user_id, meeting_id, content, chunks, embeddings, centroid
+    from jsonb_populate_record(null::memories, p_memory)
+    on conflict (meeting_id, user_id) do update
+    set content = excluded.content,
+        chunks = excluded.chunks,
+        embeddings = excluded.embeddings,
+        centroid = excluded.centroid;
+
+    update late_meeting
+    set summary = p_summary,
+        action_items = p_action_items,
+        meeting_title = p_title
+    where id = v_meeting_id;
+
+    select email into v_email
+    from users
+    where id = v_user_id and coalesce(emails_enabled, false);
+
+    if v_email is not null then
+        update late_meeting
+        set post_email_sent = true,
+            post_email_claim = p_claim_id
+        where id = v_meeting_id
+            and (
+                not coalesce(post_email_sent, false)
+                or (p_claim_id is not null and post_email_claim = p_claim_id)
+            )
+        returning true into v_claimed;
+    end if;
+
+    return jsonb_build_object(
+        'email', v_email,
+        'send_email', coalesce(v_claimed, false)
+    );
+end;
+$$;
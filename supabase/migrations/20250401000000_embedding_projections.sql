@@ -0,0 +1,25 @@
+-- Versioned projections that reduce embeddings for first-stage search, fitted
+-- offline by scripts/fit_projection.py. The matrices live in the storage
+-- bucket of the same name, at most one row is active at a time.
+create table if not exists embedding_projections (
+    version text primary key,
+    method text not null,
+    input_dim int not null,
+    output_dim int not null,
+    explained_variance real,
+    storage_path text not null,
+    active boolean not null default false,
+    created_at timestamp with time zone default now()
+);
+
+create unique index if not exists embedding_projections_single_active
+    on embedding_projections (active) where active;
+
+-- Reduced centroids for scanning memories, the full centroid reranks
+alter table memories add column if not exists centroid_reduced vector;
+alter table memories add column if not exists projection_version text
+    references embedding_projections(version);
+
+insert into storage.buckets (id, name, public)
+values ('embedding_projections', 'embedding_projections', false)
+on conflict (id) do nothing;
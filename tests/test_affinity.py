@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from realtime.affinity import (
+    AffinityProxy,
+    HashRing,
+    _with_client_address,
+    _with_connection_close,
+    meeting_id_from_request,
+)
+
+WORKERS = ["127.0.0.1:8081", "127.0.0.1:8082", "127.0.0.1:8083"]
+
+
+def head(request_line: str, *headers: str) -> bytes:
+    return "\r\n".join([request_line, "Host: localhost", *headers]).encode("latin-1") + b"\r\n\r\n"
+
+
+def header_values(raw: bytes, name: bytes) -> list:
+    return [
+        line.partition(b":")[2].strip() for line in raw.split(b"\r\n")[1:]
+        if line.partition(b":")[0].strip().lower() == name
+    ]
+
+
+@pytest.mark.parametrize("raw, body, expected", [
+    (head("GET /late_summary/abc HTTP/1.1", "X-Meeting-Id: from-header"), b"", "from-header"),
+    (head("GET /ws?meeting_id=q1&user_id=u HTTP/1.1"), b"", "q1"),
+    (head("GET /late_summary/abc HTTP/1.1"), b"", "abc"),
+    (head("POST /upload_meeting_file/m2/extra HTTP/1.1"), b"", "m2"),
+    (head("GET /check_meeting/ HTTP/1.1"), b"", None),
+    (
+        head("POST /end_meeting HTTP/1.1", "Content-Type: application/json"),
+        json.dumps({"meeting_id": 42, "transcript": "hi"}).encode(),
+        "42",
+    ),
+    (head("POST /end_meeting HTTP/1.1", "Content-Type: text/plain"), b'{"meeting_id": "m"}', None),
+    (head("POST /end_meeting HTTP/1.1", "Content-Type: application/json"), b"{not json", None),
+    (head("GET /health_check HTTP/1.1"), b"", None),
+    (b"garbage\r\n\r\n", b"", None),
+])
+def test_meeting_id_from_request(raw, body, expected):
+    assert meeting_id_from_request(raw, body) == expected
+
+
+def test_ring_is_stable_and_spreads_keys():
+    ring = HashRing(WORKERS)
+    keys = [f"meeting-{i}" for i in range(3000)]
+    owners = [ring.get(key) for key in keys]
+
+    reordered = HashRing(reversed(WORKERS))
+    assert owners == [reordered.get(key) for key in keys]
+    for worker in WORKERS:
+        assert owners.count(worker) > len(keys) / len(WORKERS) / 2
+
+
+def test_removing_a_node_only_moves_its_keys():
+    ring = HashRing(WORKERS)
+    keys = [f"meeting-{i}" for i in range(3000)]
+    before = {key: ring.get(key) for key in keys}
+
+    ring.remove(WORKERS[0])
+    for key in keys:
+        if before[key] != WORKERS[0]:
+            assert ring.get(key) == before[key]
+        else:
+            assert ring.get(key) in WORKERS[1:]
+
+    ring.add(WORKERS[0])
+    assert {key: ring.get(key) for key in keys} == before
+
+
+def test_empty_ring_has_no_owner():
+    assert HashRing().get("meeting") is None
+
+
+def test_unhealthy_worker_leaves_after_threshold():
+    proxy = AffinityProxy(WORKERS, failure_threshold=2)
+    owner = proxy.route("meeting")
+
+    proxy._mark(owner, healthy=False)
+    assert proxy.route("meeting") == owner
+    proxy._mark(owner, healthy=False)
+    assert proxy.route("meeting") != owner
+    assert owner not in {proxy.route(None) for _ in range(len(WORKERS) * 2)}
+
+    proxy._mark(owner, healthy=True)
+    assert proxy.route("meeting") == owner
+
+
+def test_client_address_replaces_spoofed_real_ip():
+    raw = head("GET / HTTP/1.1", "X-Real-IP: 6.6.6.6", "X-Forwarded-For: 10.0.0.1")
+    rewritten = _with_client_address(raw, "203.0.113.7")
+
+    assert header_values(rewritten, b"x-real-ip") == [b"203.0.113.7"]
+    assert header_values(rewritten, b"x-forwarded-for") == [b"10.0.0.1, 203.0.113.7"]
+    assert rewritten.endswith(b"\r\n\r\n")
+    assert _with_client_address(raw, None) == raw
+
+
+def test_connection_close_replaces_keep_alive():
+    rewritten = _with_connection_close(head("GET / HTTP/1.1", "Connection: keep-alive", "Keep-Alive: timeout=5"))
+
+    assert header_values(rewritten, b"connection") == [b"close"]
+    assert header_values(rewritten, b"keep-alive") == []
@@ -0,0 +1,160 @@
+import asyncio
+import threading
+
+import pytest
+
+from utils.idempotency import IdempotencyInProgress, IdempotencyStore, request_key
+
+
+class FakeRedis:
+    """The SET NX / GET / DELETE subset the store uses, shared like a real server."""
+
+    def __init__(self):
+        self.data = {}
+        self._lock = threading.Lock()
+
+    def set(self, key, value, nx=False, ex=None):
+        with self._lock:
+            if nx and key in self.data:
+                return None
+            self.data[key] = value
+            return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def store(redis, **kwargs):
+    kwargs.setdefault("wait", 1.0)
+    kwargs.setdefault("poll_interval", 0.01)
+    return IdempotencyStore(redis, **kwargs)
+
+
+def test_request_key_prefers_header():
+    assert request_key({"Idempotency-Key": "abc"}, {"a": 1}) == "abc"
+    assert request_key({"idempotency-key": "abc"}, {"a": 1}) == "abc"
+    assert request_key({}, {"a": 1, "b": 2}) == request_key(None, {"b": 2, "a": 1})
+    assert request_key({}, {"a": 1}) != request_key({}, {"a": 2})
+
+
+def test_duplicate_on_same_worker_joins_running_job():
+    calls = []
+
+    async def job():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    async def main():
+        idempotency = store(FakeRedis())
+        results = await asyncio.gather(*(idempotency.run("s", "k", job) for _ in range(3)))
+        return idempotency, results
+
+    idempotency, results = asyncio.run(main())
+    assert results == [{"ok": True}] * 3
+    assert len(calls) == 1
+    assert idempotency.stats()["joined"] == 2
+
+
+def test_duplicate_on_other_worker_gets_stored_result():
+    redis = FakeRedis()
+    calls = []
+
+    async def job():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    async def main():
+        first, second = store(redis), store(redis)
+        running = asyncio.create_task(first.run("s", "k", job))
+        await asyncio.sleep(0.01)
+        waited = await second.run("s", "k", job)
+        return await running, waited, await second.run("s", "k", job), second
+
+    result, waited, replayed, second = asyncio.run(main())
+    assert result == waited == replayed == {"ok": True}
+    assert len(calls) == 1
+    assert second.stats()["replayed"] == 2
+
+
+def test_duplicate_gives_up_after_wait():
+    redis = FakeRedis()
+
+    async def main():
+        done = asyncio.Event()
+
+        async def job():
+            await done.wait()
+            return "late"
+
+        first, second = store(redis), store(redis, wait=0.05)
+        running = asyncio.create_task(first.run("s", "k", job))
+        await asyncio.sleep(0.01)
+        with pytest.raises(IdempotencyInProgress) as raised:
+            await second.run("s", "k", job)
+        done.set()
+        await running
+        return raised.value, second
+
+    error, second = asyncio.run(main())
+    assert error.key == "idem:s:k"
+    assert error.retry_after > 0
+    assert second.stats()["busy"] == 1
+
+
+def test_failed_job_releases_its_claim():
+    redis = FakeRedis()
+    attempts = []
+
+    async def job():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("boom")
+        return "ok"
+
+    async def main():
+        idempotency = store(redis)
+        with pytest.raises(RuntimeError):
+            await idempotency.run("s", "k", job)
+        return await idempotency.run("s", "k", job)
+
+    assert asyncio.run(main()) == "ok"
+    assert len(attempts) == 2
+
+
+def test_unserializable_result_raises_and_keeps_claim():
+    redis = FakeRedis()
+    calls = []
+
+    async def job():
+        calls.append(1)
+        return object()
+
+    async def main():
+        idempotency = store(redis, wait=0.05)
+        with pytest.raises(TypeError):
+            await idempotency.run("s", "k", job)
+        with pytest.raises(IdempotencyInProgress):
+            await idempotency.run("s", "k", job)
+
+    asyncio.run(main())
+    assert len(calls) == 1
+    assert "idem:s:k" in redis.data
+
+
+def test_redis_calls_go_through_run_blocking():
+    offloaded = []
+
+    async def run_blocking(fn, *args, **kwargs):
+        offloaded.append(fn.__name__)
+        return fn(*args, **kwargs)
+
+    async def job():
+        return 1
+
+    asyncio.run(store(FakeRedis(), run_blocking=run_blocking).run("s", "k", job))
+    assert offloaded == ["set", "set"]
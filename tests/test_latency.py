@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+from ai.latency import Hedger, LatencyTracker
+
+
+def test_fast_primary_is_not_hedged():
+    hedger = Hedger(max_workers=4)
+    fallback_calls = []
+
+    result = hedger.call(lambda: "primary", lambda: fallback_calls.append(1) or "fallback", delay=1.0)
+
+    assert result == "primary"
+    assert fallback_calls == []
+    assert hedger.stats()["hedged"] == 0
+
+
+def test_slow_primary_is_hedged_and_fallback_wins():
+    hedger = Hedger(max_workers=4)
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return "primary"
+
+    try:
+        assert hedger.call(slow, lambda: "fallback", delay=0.05) == "fallback"
+        assert hedger.stats()["hedged"] == 1
+    finally:
+        release.set()
+
+
+def test_failed_primary_is_hedged_immediately():
+    hedger = Hedger(max_workers=4)
+
+    def failing():
+        raise RuntimeError("boom")
+
+    start = time.monotonic()
+    assert hedger.call(failing, lambda: "fallback", delay=5.0) == "fallback"
+    assert time.monotonic() - start < 1.0
+
+
+def test_both_failing_raises_last_error():
+    hedger = Hedger(max_workers=4)
+
+    def failing():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        hedger.call(failing, failing, delay=0.01)
+
+
+def test_saturated_pool_runs_primary_unhedged():
+    hedger = Hedger(max_workers=2)
+    release = threading.Event()
+
+    def stuck():
+        release.wait(5)
+        return "stuck"
+
+    try:
+        # the losing primary keeps its thread, so the pool has no room for two more
+        assert hedger.call(stuck, lambda: "fallback", delay=0.01) == "fallback"
+        caller = threading.get_ident()
+        assert hedger.call(lambda: threading.get_ident(), lambda: None, delay=1.0) == caller
+        assert hedger.stats()["skipped"] == 1
+    finally:
+        release.set()
+
+    deadline = time.monotonic() + 2
+    while hedger.stats()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert hedger.stats()["in_flight"] == 0
+
+
+def test_percentile_needs_min_samples():
+    tracker = LatencyTracker(min_samples=3)
+    tracker.record("m", 0.1)
+    tracker.record("m", 0.2)
+    assert tracker.percentile("m", 50) is None
+
+    tracker.record("m", 0.3)
+    tracker.record("m", 9.0, ok=False)
+    assert tracker.percentile("m", 100) == 0.3
+    assert tracker.error_rate("m") == 0.25
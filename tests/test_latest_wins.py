@@ -0,0 +1,89 @@
+import asyncio
+
+from realtime.latest_wins import LatestWinsScheduler
+
+
+def test_newer_run_supersedes_older_one():
+    scheduler = LatestWinsScheduler()
+    finished = []
+
+    async def work(value):
+        await asyncio.sleep(0.05)
+        finished.append(value)
+        return value
+
+    async def main():
+        first = asyncio.create_task(scheduler.run("k", work, 1))
+        await asyncio.sleep(0.01)
+        return await asyncio.gather(first, scheduler.run("k", work, 2))
+
+    assert asyncio.run(main()) == [None, 2]
+    assert finished == [2]
+    assert scheduler.stats()["superseded"] == 1
+    assert scheduler.stats()["in_flight"] == 0
+
+
+def test_keys_run_independently():
+    scheduler = LatestWinsScheduler()
+
+    async def work(value):
+        await asyncio.sleep(0.01)
+        return value
+
+    async def main():
+        return await asyncio.gather(scheduler.run("a", work, 1), scheduler.run("b", work, 2))
+
+    assert asyncio.run(main()) == [1, 2]
+
+
+def test_debounce_only_runs_the_last_of_a_burst():
+    scheduler = LatestWinsScheduler(debounce=0.05)
+    calls = []
+
+    async def work(value):
+        calls.append(value)
+        return value
+
+    async def main():
+        return await asyncio.gather(*(scheduler.run("k", work, value) for value in range(5)))
+
+    assert asyncio.run(main()) == [None, None, None, None, 4]
+    assert calls == [4]
+
+
+def test_cooldown_after_truthy_result():
+    scheduler = LatestWinsScheduler(cooldown=60)
+
+    async def work(value):
+        return value
+
+    async def main():
+        # a falsy result doesn't start the cooldown
+        empty = await scheduler.run("k", work, "")
+        found = await scheduler.run("k", work, "suggestion")
+        throttled = await scheduler.run("k", work, "again")
+        scheduler.discard("k")
+        return empty, found, throttled, await scheduler.run("k", work, "after discard")
+
+    assert asyncio.run(main()) == ("", "suggestion", None, "after discard")
+    assert scheduler.stats()["throttled"] == 1
+
+
+def test_cancelled_caller_cancels_its_run():
+    scheduler = LatestWinsScheduler()
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+
+    async def main():
+        caller = asyncio.create_task(scheduler.run("k", work))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.sleep(0.1)
+        return caller.cancelled()
+
+    assert asyncio.run(main())
+    assert finished == []
+    assert scheduler.stats()["in_flight"] == 0
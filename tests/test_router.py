@@ -0,0 +1,85 @@
+import pytest
+
+from ai.router import CircuitBreaker, ModelRouter, is_provider_failure
+
+
+class APITimeoutError(Exception):
+    pass
+
+
+class BadRequestError(Exception):
+    status_code = 400
+
+
+class InternalServerError(Exception):
+    status_code = 500
+
+
+def open_breaker(router: ModelRouter, model: str):
+    for _ in range(router.failure_threshold):
+        router.record(model, 1.0, ok=False, error=APITimeoutError())
+
+
+@pytest.mark.parametrize("error, expected", [
+    (TimeoutError(), True),
+    (ConnectionError(), True),
+    (APITimeoutError(), True),
+    (InternalServerError(), True),
+    (BadRequestError(), False),
+    (ValueError("bad schema"), False),
+])
+def test_is_provider_failure(error, expected):
+    assert is_provider_failure(error) is expected
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_half_open_lets_a_single_trial_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    assert not breaker.is_available()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_rejected_input_leaves_closed_breaker_alone():
+    router = ModelRouter(failure_threshold=2)
+    for _ in range(5):
+        router.record("m", 0.1, ok=False, error=BadRequestError())
+
+    breaker = router.breaker("m")
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+
+
+def test_rejected_input_doesnt_close_half_open_breaker():
+    router = ModelRouter(failure_threshold=1, reset_timeout=0)
+    open_breaker(router, "m")
+    breaker = router.breaker("m")
+    assert breaker.allow()
+
+    router.record("m", 0.1, ok=False, error=BadRequestError())
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # the trial slot is free again for a call that can tell whether the provider recovered
+    assert breaker.allow()
+    router.record("m", 0.1, ok=False, error=APITimeoutError())
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_failure_without_error_counts_against_provider():
+    router = ModelRouter(failure_threshold=1)
+    router.record("m", 0.1, ok=False)
+    assert router.breaker("m").state == CircuitBreaker.OPEN
@@ -0,0 +1,62 @@
+from ai.suggestion_cache import SemanticSuggestionCache
+
+
+def test_similar_question_hits_and_different_one_misses():
+    cache = SemanticSuggestionCache(threshold=0.9)
+    cache.store("m", [1.0, 0.0, 0.0], "answer")
+
+    assert cache.lookup("m", [0.99, 0.05, 0.0]) == "answer"
+    assert cache.lookup("m", [0.0, 1.0, 0.0]) is None
+    assert cache.lookup("other", [1.0, 0.0, 0.0]) is None
+    assert cache.stats()["hit_rate"] == 1 / 3
+
+
+def test_closest_entry_wins():
+    cache = SemanticSuggestionCache(threshold=0.5)
+    cache.store("m", [1.0, 0.0], "x")
+    cache.store("m", [0.0, 1.0], "y")
+
+    assert cache.lookup("m", [0.2, 0.9]) == "y"
+
+
+def test_entries_expire():
+    cache = SemanticSuggestionCache(ttl=-1)
+    cache.store("m", [1.0, 0.0], "answer")
+
+    assert cache.lookup("m", [1.0, 0.0]) is None
+
+
+def test_entries_and_meetings_are_bounded():
+    cache = SemanticSuggestionCache(max_entries=2, max_meetings=2)
+    for i, vector in enumerate([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]):
+        cache.store("m", vector, str(i))
+    assert cache.lookup("m", [1.0, 0.0, 0.0]) is None
+    assert cache.lookup("m", [0.0, 0.0, 1.0]) == "2"
+
+    cache.store("a", [1.0, 0.0, 0.0], "a")
+    cache.store("b", [1.0, 0.0, 0.0], "b")
+    assert cache.lookup("m", [0.0, 0.0, 1.0]) is None
+    assert cache.stats()["meetings"] == 2
+
+
+def test_invalidate_drops_meeting():
+    cache = SemanticSuggestionCache()
+    cache.store("m", [1.0, 0.0], "answer")
+    cache.invalidate("m")
+
+    assert cache.lookup("m", [1.0, 0.0]) is None
+
+
+def test_embed_reuses_normalized_text():
+    cache = SemanticSuggestionCache(max_embeddings=1)
+    calls = []
+
+    def embed(text):
+        calls.append(text)
+        return [float(len(calls))]
+
+    assert cache.embed("What is  the plan?", embed) == [1.0]
+    assert cache.embed("what is the PLAN?", embed) == [1.0]
+    cache.embed("something else", embed)
+    assert cache.embed("what is the plan?", embed) == [3.0]
+    assert len(calls) == 3
@@ -0,0 +1,84 @@
+import pytest
+
+pytest.importorskip("httpx")
+
+from database.transcripts import TranscriptStore, _decompressor, compress  # noqa: E402
+
+TRANSCRIPT = "Alice: let's ship it on Friday. Bob: ça marche 👍\n" * 200
+
+
+def decompress_in_chunks(name: str, data: bytes, chunk_size: int = 7) -> bytes:
+    decompressor = _decompressor(name)
+    if decompressor is None:
+        return data
+    out = b"".join(decompressor.decompress(data[i:i + chunk_size]) for i in range(0, len(data), chunk_size))
+    if hasattr(decompressor, "flush"):
+        out += decompressor.flush()
+    return out
+
+
+class FakeBucket:
+    def __init__(self):
+        self.objects = {}
+        self.uploads = 0
+
+    def upload(self, path, file, file_options):
+        self.uploads += 1
+        self.objects[path] = (file, file_options["content-type"])
+
+    def list(self, options):
+        return [{"name": name} for name in self.objects if name == options["search"]]
+
+    def get_public_url(self, name):
+        return f"https://storage.test/transcripts/{name}"
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.bucket = FakeBucket()
+        self.storage = self
+
+    def from_(self, bucket):
+        return self.bucket
+
+
+@pytest.mark.parametrize("codec", ["none", "gzip", "zstd"])
+def test_codec_round_trip(codec):
+    if codec == "zstd":
+        pytest.importorskip("zstandard")
+    store = TranscriptStore(FakeSupabase(), codec=codec)
+    data = TRANSCRIPT.encode("utf-8")
+    name = store.blob_name(data)
+
+    assert decompress_in_chunks(name, compress(data, codec)).decode("utf-8") == TRANSCRIPT
+
+
+def test_blob_names():
+    data = TRANSCRIPT.encode("utf-8")
+    plain = TranscriptStore(FakeSupabase(), codec="none").blob_name(data)
+
+    assert plain.endswith(".txt")
+    assert TranscriptStore(FakeSupabase(), codec="gzip").blob_name(data) == f"{plain}.gz"
+    assert TranscriptStore(FakeSupabase(), codec="zstd").blob_name(data) == f"{plain}.zst"
+
+
+def test_plain_text_is_the_default():
+    supabase = FakeSupabase()
+    url = TranscriptStore(supabase).store(TRANSCRIPT)
+
+    stored, content_type = supabase.bucket.objects[url.rsplit("/", 1)[1]]
+    assert stored == TRANSCRIPT.encode("utf-8")
+    assert content_type.startswith("text/plain")
+
+
+def test_identical_transcript_is_uploaded_once():
+    supabase = FakeSupabase()
+    first, second = TranscriptStore(supabase, codec="gzip"), TranscriptStore(supabase, codec="gzip")
+
+    assert first.store(TRANSCRIPT) == first.store(TRANSCRIPT) == second.store(TRANSCRIPT)
+    assert supabase.bucket.uploads == 1
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        TranscriptStore(FakeSupabase(), codec="lz4")
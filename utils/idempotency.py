@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+class IdempotencyInProgress(Exception):
+    """The same request is still running on another worker, retry later."""
+
+    def __init__(self, key: str, retry_after: float):
+        super().__init__(f"{key} is still in progress")
+        self.key = key
+        self.retry_after = retry_after
+
+
+def request_key(headers, payload: dict) -> str:
+    """The client's Idempotency-Key header, or a hash of the request payload."""
+    header = None
+    if headers is not None:
+        header = headers.get(IDEMPOTENCY_HEADER) or headers.get(IDEMPOTENCY_HEADER.lower())
+    if header:
+        return header
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+async def _to_thread(fn, *args, **kwargs):
+    return await asyncio.to_thread(fn, *args, **kwargs)
+
+
+class IdempotencyStore:
+    """
+    Runs a job at most once per key across every worker.
+
+    The first call claims `idem:{scope}:{key}` in Redis with SET NX and runs
+    the job; the completed result replaces the claim for `ttl` seconds. A
+    duplicate on the same worker awaits the in-flight job directly, one on
+    another worker polls the key for up to `wait` seconds for the result and
+    then raises IdempotencyInProgress. A failed job releases its claim so a
+    retry runs it again, and a claim left by a dead worker expires after
+    `lock_ttl` seconds.
+
+    Redis is sync here, so its calls go through `run_blocking` (a coroutine
+    function taking fn, *args) to stay off the event loop.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        ttl: int = 60 * 60 * 24,
+        lock_ttl: int = 300,
+        wait: float = 10.0,
+        poll_interval: float = 0.5,
+        run_blocking: Callable[..., Awaitable[Any]] = _to_thread,
+    ):
+        self.redis = redis_client
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.wait = wait
+        self.poll_interval = poll_interval
+        self.run_blocking = run_blocking
+        self._in_flight = {}
+        self.executed = 0
+        self.replayed = 0
+        self.joined = 0
+        self.busy = 0
+
+    async def run(self, scope: str, key: str, job: Callable[[], Awaitable[Any]]) -> Any:
+        redis_key = f"idem:{scope}:{key}"
+        deadline = time.monotonic() + self.wait
+        while True:
+            in_flight = self._in_flight.get(redis_key)
+            if in_flight is not None:
+                self.joined += 1
+                return await asyncio.shield(in_flight)
+
+            claimed = await self.run_blocking(
+                self.redis.set, redis_key, json.dumps({"status": "in_progress"}), nx=True, ex=self.lock_ttl
+            )
+            if claimed:
+                return await self._execute(redis_key, job)
+
+            stored = await self._load(redis_key)
+            if stored is not None and stored["status"] == "completed":
+                self.replayed += 1
+                return stored["result"]
+            if time.monotonic() >= deadline:
+                self.busy += 1
+                raise IdempotencyInProgress(redis_key, retry_after=self.poll_interval * 4)
+            # running on another worker, or released by a failure and claimable again
+            await asyncio.sleep(self.poll_interval)
+
+    async def _execute(self, redis_key: str, job: Callable[[], Awaitable[Any]]) -> Any:
+        self.executed += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[redis_key] = future
+        try:
+            try:
+                result = await job()
+            except BaseException:
+                await self._release(redis_key)
+                raise
+            try:
+                value = json.dumps({"status": "completed", "result": result})
+            except (TypeError, ValueError) as e:
+                # the job ran, so its claim stays until lock_ttl rather than
+                # letting the next duplicate run it again
+                logger.error(f"Result for {redis_key} can't be stored for replay: {str(e)}")
+                raise
+        except BaseException as e:
+            future.set_exception(e)
+            # mark retrieved for when no duplicate was waiting on it
+            future.exception()
+            raise
+        finally:
+            self._in_flight.pop(redis_key, None)
+
+        await self.run_blocking(self.redis.set, redis_key, value, ex=self.ttl)
+        future.set_result(result)
+        return result
+
+    async def _load(self, redis_key: str) -> Optional[dict]:
+        value = await self.run_blocking(self.redis.get, redis_key)
+        return json.loads(value) if value else None
+
+    async def _release(self, redis_key: str):
+        try:
+            await self.run_blocking(self.redis.delete, redis_key)
+        except Exception as e:
+            logger.error(f"Failed to release idempotency key {redis_key}: {str(e)}")
+
+    def stats(self) -> dict:
+        return {
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "joined": self.joined,
+            "busy": self.busy,
+            "in_flight": len(self._in_flight),
+        }
@@ -0,0 +1,175 @@
+import re
+from typing import List
+
+# yes, we've built our own markdown to html converter.
+
+FENCE_RE = re.compile(r'^(```|~~~)\s*$')
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.*)')
+HR_RE = re.compile(r'^(\*[\s\*]*|\-[\s\-]*|_[\s_]*)$')
+WHITESPACE_RE = re.compile(r'\s+')
+BLOCKQUOTE_RE = re.compile(r'^>\s?(.*)')
+UL_RE = re.compile(r'^(\*|\-|\+)\s+(.*)')
+OL_RE = re.compile(r'^(\d+)\.\s+(.*)')
+
+IMAGE_RE = re.compile(r'!\[([^\]]*)\]\(([^)]+)\)')
+LINK_RE = re.compile(r'\[([^\]]+)\]\(([^)]+)\)')
+BOLD_RE = re.compile(r'(\*\*|__)(.+?)\1')
+ITALIC_RE = re.compile(r'(\*|_)(.+?)\1')
+CODE_RE = re.compile(r'`([^`]+)`')
+
+HR_CHARS = frozenset('*-_')
+UL_CHARS = frozenset('*-+')
+FENCE_CHARS = frozenset('`~')
+
+
+def parse_inline(text: str) -> str:
+    """
+    Perform inline replacements, in this order:
+     - Images: ![alt](url)
+     - Links: [text](url)
+     - Bold: **text** or __text__
+     - Italic: *text* or _text_
+     - Inline code: `code`
+    Each pass is skipped when its marker character doesn't occur at all.
+    """
+    if '[' in text:
+        if '!' in text:
+            text = IMAGE_RE.sub(r'<img alt="\1" src="\2">', text)
+        text = LINK_RE.sub(r'<a href="\2">\1</a>', text)
+    if '*' in text or '_' in text:
+        text = BOLD_RE.sub(r'<strong>\2</strong>', text)
+        text = ITALIC_RE.sub(r'<em>\2</em>', text)
+    if '`' in text:
+        text = CODE_RE.sub(r'<code>\1</code>', text)
+    return text
+
+
+def _escape_code(code: str) -> str:
+    return code.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _render(lines: List[str], html_output: List[str]):
+    """
+    Render `lines` into `html_output` in a single pass. Each line is classified
+    by its first character before any pattern is tried, so most lines run at
+    most one precompiled regex.
+    """
+    in_code_block = False
+    code_block_delimiter = None
+    code_lines = []
+    paragraph_lines = []
+
+    def flush_paragraph():
+        """Close out the current paragraph buffer and convert it into an HTML <p> block."""
+        if paragraph_lines:
+            html_output.append(f"<p>{parse_inline(' '.join(paragraph_lines))}</p>")
+            paragraph_lines.clear()
+
+    n = len(lines)
+    i = 0
+    while i < n:
+        line = lines[i]
+        first = line[:1]
+
+        # Fenced code block (start or end)
+        if first in FENCE_CHARS and first:
+            fence_match = FENCE_RE.match(line)
+            if fence_match:
+                fence = fence_match.group(1)
+                if not in_code_block:
+                    flush_paragraph()
+                    in_code_block = True
+                    code_block_delimiter = fence
+                    code_lines = []
+                elif fence == code_block_delimiter:
+                    in_code_block = False
+                    html_output.append(f"<pre><code>{_escape_code(chr(10).join(code_lines))}</code></pre>")
+                i += 1
+                continue
+
+        if in_code_block:
+            code_lines.append(line)
+            i += 1
+            continue
+
+        # Headings: (#{1,6} + text)
+        if first == '#':
+            heading_match = HEADING_RE.match(line)
+            if heading_match:
+                flush_paragraph()
+                level = len(heading_match.group(1))
+                html_output.append(f"<h{level}>{parse_inline(heading_match.group(2))}</h{level}>")
+                i += 1
+                continue
+
+        stripped = line.strip()
+
+        # Horizontal rule, requires 3 or more symbols
+        if stripped[:1] in HR_CHARS and stripped and HR_RE.match(stripped):
+            if len(WHITESPACE_RE.sub('', line)) >= 3:
+                flush_paragraph()
+                html_output.append("<hr/>")
+                i += 1
+                continue
+
+        # Blockquote, its content is rendered recursively
+        if first == '>':
+            flush_paragraph()
+            quote_lines = []
+            while i < n and lines[i][:1] == '>':
+                quote_lines.append(BLOCKQUOTE_RE.match(lines[i]).group(1))
+                i += 1
+            inner_html = []
+            _render(quote_lines, inner_html)
+            html_output.append(f"<blockquote>{chr(10).join(inner_html)}</blockquote>")
+            continue
+
+        # Lists, unordered (-, + or *) or ordered (number followed by a period)
+        list_re = None
+        if first in UL_CHARS and first:
+            list_re, list_tag = UL_RE, "ul"
+        elif first.isdigit():
+            list_re, list_tag = OL_RE, "ol"
+        if list_re is not None and list_re.match(line):
+            flush_paragraph()
+            html_output.append(f"<{list_tag}>")
+            while i < n:
+                item_match = list_re.match(lines[i])
+                if not item_match:
+                    break
+                html_output.append(f"  <li>{parse_inline(item_match.group(2))}</li>")
+                i += 1
+            html_output.append(f"</{list_tag}>")
+            continue
+
+        # An empty line signals a paragraph break
+        if not stripped:
+            flush_paragraph()
+            i += 1
+            continue
+
+        # Otherwise, treat it as part of a paragraph
+        paragraph_lines.append(stripped)
+        i += 1
+
+    # Flush any remaining paragraph at the end
+    flush_paragraph()
+
+
+def markdown_to_html(markdown: str) -> str:
+    """
+    Convert a Markdown string to an HTML string, without using third-party libraries.
+    Supports a large subset of core Markdown features:
+      - Headings
+      - Bold, italic
+      - Inline code
+      - Fenced code blocks
+      - Links, images
+      - Blockquotes
+      - Unordered and ordered lists
+      - Horizontal rules
+      - Paragraphs
+    """
+    html_output = []
+    _render(markdown.split('\n'), html_output)
+    return "\n".join(html_output)
@@ -0,0 +1,32 @@
+import os
+import threading
+from typing import Callable
+
+
+class OncePerProcess:
+    """
+    Runs `start` once in every process that calls `ensure`.
+
+    index.py builds its shared objects before Robyn forks the workers, and
+    threads, pools and subscriptions don't survive a fork, so each of them is
+    started lazily the first time a worker process uses it.
+    """
+
+    def __init__(self, start: Callable[[], None]):
+        self._start = start
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        """Whether `start` already ran in this process."""
+        return self._pid == os.getpid()
+
+    def ensure(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._start()
+            self._pid = os.getpid()
@@ -0,0 +1,122 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, List
+
+from utils.process_local import OncePerProcess
+
+logger = logging.getLogger(__name__)
+
+
+class EventBuffer:
+    """
+    Bounded buffer of analytics events flushed in batches by a background thread.
+
+    Events are kept in process memory, or in a Redis list when `redis_client`
+    is given so that all workers share one buffer and events survive a worker
+    restart. Once the buffer holds `max_size` events new ones are dropped and
+    counted instead of slowing down the request path.
+    """
+
+    def __init__(
+        self,
+        flush_fn: Callable[[List[dict]], None],
+        batch_size=500,
+        flush_interval=5.0,
+        max_size=10000,
+        redis_client=None,
+        redis_key="analytics:buffer",
+    ):
+        self.flush_fn = flush_fn
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self.redis_client = redis_client
+        self.redis_key = redis_key
+        self._events = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher = OncePerProcess(self._start_flusher)
+        self.counters = {"accepted": 0, "dropped": 0, "flushed": 0, "failed_batches": 0}
+
+    def append(self, event: dict) -> bool:
+        """Buffer `event`, returning False if it was dropped because the buffer is full."""
+        self._flusher.ensure()
+        if self.redis_client is not None:
+            accepted = self._redis_append(event)
+        else:
+            with self._lock:
+                accepted = len(self._events) < self.max_size
+                if accepted:
+                    self._events.append(event)
+
+        self.counters["accepted" if accepted else "dropped"] += 1
+        return accepted
+
+    def _redis_append(self, event: dict) -> bool:
+        pipe = self.redis_client.pipeline()
+        pipe.rpush(self.redis_key, json.dumps(event))
+        pipe.ltrim(self.redis_key, 0, self.max_size - 1)
+        length, _ = pipe.execute()
+        return length <= self.max_size
+
+    def _take(self) -> List[dict]:
+        if self.redis_client is not None:
+            # LPOP with a count is atomic, so concurrent flushers never share events
+            items = self.redis_client.lpop(self.redis_key, self.batch_size) or []
+            return [json.loads(item) for item in items]
+        with self._lock:
+            return [self._events.popleft() for _ in range(min(self.batch_size, len(self._events)))]
+
+    def _requeue(self, batch: List[dict]):
+        if self.redis_client is not None:
+            self.redis_client.rpush(self.redis_key, *[json.dumps(event) for event in batch])
+            return
+        with self._lock:
+            room = self.max_size - len(self._events)
+            self._events.extendleft(reversed(batch[:room]))
+            self.counters["dropped"] += max(len(batch) - room, 0)
+
+    def flush(self) -> int:
+        """Insert everything buffered right now, returning the number of events written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._take()
+                if not batch:
+                    return written
+                try:
+                    self.flush_fn(batch)
+                except Exception as e:
+                    logger.error(f"Failed to flush {len(batch)} analytics events: {str(e)}")
+                    self.counters["failed_batches"] += 1
+                    self._requeue(batch)
+                    return written
+                written += len(batch)
+                self.counters["flushed"] += len(batch)
+                if len(batch) < self.batch_size:
+                    return written
+
+    def _start_flusher(self):
+        threading.Thread(target=self._run, name="analytics-flusher", daemon=True).start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Analytics flusher error: {str(e)}")
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+
+    def stats(self) -> dict:
+        if self.redis_client is not None:
+            buffered = self.redis_client.llen(self.redis_key)
+        else:
+            buffered = len(self._events)
+        return {**self.counters, "buffered": buffered, "max_size": self.max_size}
@@ -0,0 +1,151 @@
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from ai.latency import LatencyTracker
+from utils.process_local import OncePerProcess
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundQueueFull(Exception):
+    pass
+
+
+@dataclass
+class TaskPolicy:
+    # attempts after the first one
+    retries: int = 0
+    # seconds before the first retry, doubled on every following one
+    backoff: float = 1.0
+
+
+@dataclass
+class _Task:
+    task_type: str
+    fn: Callable
+    args: tuple
+    kwargs: dict
+    enqueued_at: float
+    on_failure: Optional[Callable[[Exception], None]] = None
+
+
+_SHUTDOWN = object()
+
+
+class BackgroundExecutor:
+    """
+    Process-wide pool of worker threads fed by a bounded queue.
+
+    Tasks are submitted under a named type ("memory_storage", "transcript_upload",
+    "emails", ...) which selects their retry policy and groups their stats. When
+    the queue is full `submit` blocks for up to `timeout` seconds before raising
+    BackgroundQueueFull, so producers slow down instead of piling up threads.
+    Worker threads are started lazily so that each forked worker process gets
+    its own.
+    """
+
+    def __init__(self, workers=4, max_queue=200, policies: Optional[Dict[str, TaskPolicy]] = None):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.policies = policies or {}
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._workers = OncePerProcess(self._start_workers)
+        self._accepting = True
+        self._counters = defaultdict(lambda: defaultdict(int))
+        self._latency = LatencyTracker(min_samples=1)
+
+    def _start_workers(self):
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"background-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, task_type: str, fn: Callable, *args, timeout: float = 0, on_failure=None, **kwargs):
+        """
+        Queue `fn(*args, **kwargs)`. `on_failure` is called with the last error
+        once the task has failed all its attempts.
+        """
+        if not self._accepting:
+            raise BackgroundQueueFull("Background executor is shutting down")
+        self._workers.ensure()
+
+        task = _Task(task_type, fn, args, kwargs, time.monotonic(), on_failure)
+        try:
+            self._queue.put(task, timeout=timeout) if timeout else self._queue.put_nowait(task)
+        except queue.Full:
+            self._counters[task_type]["rejected"] += 1
+            raise BackgroundQueueFull(f"Background queue full, rejected {task_type} task")
+        self._counters[task_type]["submitted"] += 1
+
+    def _worker(self):
+        while True:
+            task = self._queue.get()
+            try:
+                if task is _SHUTDOWN:
+                    return
+                self._run(task)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, task: _Task):
+        policy = self.policies.get(task.task_type, TaskPolicy())
+        delay = policy.backoff
+        for attempt in range(policy.retries + 1):
+            try:
+                task.fn(*task.args, **task.kwargs)
+                self._counters[task.task_type]["succeeded"] += 1
+                self._latency.record(task.task_type, time.monotonic() - task.enqueued_at)
+                return
+            except Exception as e:
+                if attempt < policy.retries:
+                    logger.warning(f"{task.task_type} task failed, retrying in {delay}s: {str(e)}")
+                    self._counters[task.task_type]["retried"] += 1
+                    time.sleep(delay)
+                    delay *= 2
+                else:
+                    logger.error(f"{task.task_type} task failed: {str(e)}", exc_info=True)
+                    self._counters[task.task_type]["failed"] += 1
+                    self._latency.record(task.task_type, time.monotonic() - task.enqueued_at, ok=False)
+                    if task.on_failure is not None:
+                        try:
+                            task.on_failure(e)
+                        except Exception as callback_error:
+                            logger.error(f"{task.task_type} failure callback failed: {str(callback_error)}")
+
+    def stats(self) -> dict:
+        latency = self._latency.snapshot()
+        return {
+            "queue_length": self._queue.qsize(),
+            "max_queue": self.max_queue,
+            "workers": self.workers,
+            "tasks": {
+                task_type: {**counters, "latency": latency.get(task_type)}
+                for task_type, counters in self._counters.items()
+            },
+        }
+
+    def shutdown(self, timeout: float = 30.0):
+        """Stop accepting tasks and let the workers drain the queue."""
+        self._accepting = False
+        if not self._workers.started:
+            return
+        deadline = time.monotonic() + timeout
+        for _ in self._threads:
+            try:
+                self._queue.put(_SHUTDOWN, timeout=max(deadline - time.monotonic(), 0.01))
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+        pending = self._queue.qsize()
+        if pending:
+            logger.warning(f"Background executor shut down with {pending} tasks still queued")
@@ -0,0 +1,125 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from utils.process_local import OncePerProcess
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMITS = {
+    "llm": 16,
+    "embedding": 16,
+    "vectors": 4,
+    "supabase": 32,
+    "storage": 8,
+    "email": 8,
+    "background": 8,
+    "pdf": 2,
+    "meeting_state": 16,
+    "redis": 16,
+    # shared by every category without its own limit
+    "default": 4,
+}
+
+
+class Offloader:
+    """
+    Runs blocking work off the event loop under per-category concurrency limits.
+
+    `run` hands blocking I/O (provider SDKs, Supabase, storage, email) to a
+    thread pool; `run_cpu` hands CPU-heavy parsing to a process pool so it
+    doesn't hold the GIL the event loop needs. Every call takes a slot of its
+    category's semaphore for as long as the work actually runs, and the thread
+    pool has a thread for every slot, so a burst in one category can't delay
+    the others. Cancelling the caller stops it waiting, the work itself
+    finishes and is dropped.
+
+    Pools are created lazily so each forked worker process gets its own. Pool
+    processes are forked from a fork server preloading workers.parsing rather
+    than from a worker full of threads and open connections. multiprocessing
+    still imports the main script in each of them, which is why the backend
+    is started from server.py and not from index.py.
+    """
+
+    def __init__(self, cpu_workers: int = 2, limits: Optional[Dict[str, int]] = None):
+        self.cpu_workers = cpu_workers
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        # threads are only started as work arrives, idle categories cost nothing
+        self.io_workers = sum(self.limits.values())
+        self._threads = None
+        self._processes = None
+        self._semaphores = {}
+        self._pools = OncePerProcess(self._start_pools)
+        self._stats = defaultdict(lambda: {"waiting": 0, "running": 0, "completed": 0, "failed": 0})
+
+    async def run(self, category: str, fn: Callable, *args, **kwargs):
+        """Run `fn(*args, **kwargs)` in the thread pool."""
+        self._pools.ensure()
+        return await self._submit(self._threads, category, functools.partial(fn, *args, **kwargs))
+
+    async def run_cpu(self, category: str, fn: Callable, *args):
+        """Run `fn(*args)` in the process pool, `fn` and its arguments must be picklable."""
+        self._pools.ensure()
+        if self._processes is None:
+            self._processes = self._make_process_pool()
+        return await self._submit(self._processes, category, functools.partial(fn, *args))
+
+    async def _submit(self, executor, category: str, call: Callable):
+        limit_key = category if category in self.limits else "default"
+        semaphore = self._semaphores.get(limit_key)
+        if semaphore is None:
+            semaphore = self._semaphores[limit_key] = asyncio.Semaphore(self.limits[limit_key])
+        stats = self._stats[category]
+
+        stats["waiting"] += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            stats["waiting"] -= 1
+        stats["running"] += 1
+        try:
+            future = asyncio.get_running_loop().run_in_executor(executor, call)
+        except BaseException:
+            stats["running"] -= 1
+            semaphore.release()
+            raise
+
+        def done(f):
+            stats["running"] -= 1
+            stats["failed" if f.cancelled() or f.exception() else "completed"] += 1
+            semaphore.release()
+
+        future.add_done_callback(done)
+        # shielded so the slot stays taken until the work is really over
+        return await asyncio.shield(future)
+
+    def _start_pools(self):
+        self._threads = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="offload")
+        self._processes = None
+        self._semaphores = {}
+        self._stats.clear()
+
+    def _make_process_pool(self) -> ProcessPoolExecutor:
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(["workers.parsing"])
+        else:
+            context = multiprocessing.get_context("spawn")
+        return ProcessPoolExecutor(max_workers=self.cpu_workers, mp_context=context)
+
+    def stats(self) -> dict:
+        return {
+            category: {**stats, "limit": self.limits.get(category, self.limits["default"])}
+            for category, stats in self._stats.items()
+        }
+
+    def shutdown(self):
+        if not self._pools.started:
+            return
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
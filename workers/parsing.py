@@ -0,0 +1,44 @@
+"""
+CPU-heavy parsing run in the offload process pool, see workers/offload.py.
+
+Everything here is a plain module-level function of picklable arguments, and
+this module doesn't import index.py so the fork server can preload it alone.
+"""
+from io import BytesIO
+from typing import List
+
+
+def get_chunks(text: str, max_chars: int = 200, overlap: int = 50) -> List[str]:
+    chunks = []
+    start = 0
+    while start < len(text):
+        chunk = text[start:start + max_chars]
+        chunks.append(chunk)
+        start += max_chars - overlap
+
+    if start < len(text):
+        chunks.append(text[start:])
+
+    return chunks
+
+
+def extract_text(file_path: str) -> str:
+    import fitz
+    with fitz.open(file_path) as pdf_document:
+        text = ""
+        for page_num in range(pdf_document.page_count):
+            page = pdf_document[page_num]
+            text += page.get_text()
+    return text
+
+
+def extract_pdf_text(file_contents: bytes) -> str:
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(BytesIO(file_contents))
+    return "".join(page.extract_text() for page in reader.pages)
+
+
+def pdf_chunks(file_contents: bytes) -> List[str]:
+    """Text chunks of a PDF, parsed and chunked in one go so only the chunks are sent back."""
+    return get_chunks(extract_pdf_text(file_contents))